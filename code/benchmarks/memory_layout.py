@@ -0,0 +1,102 @@
+"""内存占用对比：旧的 to_dict('records') 行字典布局 vs SheetData 列式布局
+
+用法:
+    python benchmarks/memory_layout.py                      # 合成数据 50000行 × 20列
+    python benchmarks/memory_layout.py --rows 200000 --cols 10
+    python benchmarks/memory_layout.py excel_files/*.xlsx   # 实际工作簿
+"""
+import os
+import sys
+import gc
+import json
+import pickle
+import argparse
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from main import SheetData  # noqa: E402
+from sheet_cache import read_excel_frames  # noqa: E402
+
+
+def synthetic_frame(rows, cols, seed=0):
+    """生成混合类型的合成工作表：整数、带空值的浮点数、中英文文本、日期"""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(cols):
+        kind = i % 4
+        if kind == 0:
+            data[f"编号{i}"] = rng.integers(0, 1_000_000, rows)
+        elif kind == 1:
+            values = rng.random(rows) * 1000
+            values[rng.random(rows) < 0.1] = np.nan
+            data[f"数量{i}"] = values
+        elif kind == 2:
+            words = np.array(['螺栓', '垫片', 'bolt', 'nut', '轴承', 'A-100', '损耗率', 'washer'])
+            data[f"名称{i}"] = [f"{w}-{n}" for w, n in zip(words[rng.integers(0, len(words), rows)],
+                                                         rng.integers(0, 10_000, rows))]
+        else:
+            data[f"日期{i}"] = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D')
+    return pd.DataFrame(data)
+
+
+def records_layout(frame):
+    """旧布局"""
+    frame = frame.fillna('')
+    return {
+        'data': frame.to_dict('records'),
+        'columns': list(frame.columns),
+        'row_count': len(frame),
+        'col_count': len(frame.columns)
+    }
+
+
+def measure(frames_blob, build):
+    """在tracemalloc下从序列化数据重建工作表并转换为目标布局，返回常驻字节数和峰值"""
+    gc.collect()
+    tracemalloc.start()
+    frames = pickle.loads(frames_blob)  # 每次都重建全新的对象，避免两种布局共享字符串
+    result = {name: build(frame) for name, frame in frames.items()}
+    del frames
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较两种工作表内存布局")
+    parser.add_argument('files', nargs='*', help="要测量的Excel文件，不指定时使用合成数据")
+    parser.add_argument('--rows', type=int, default=50_000)
+    parser.add_argument('--cols', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.files:
+        frames = {}
+        for path in args.files:
+            for sheet_name, frame in read_excel_frames(path).items():
+                frames[f"{os.path.basename(path)}/{sheet_name}"] = frame
+    else:
+        frames = {'synthetic': synthetic_frame(args.rows, args.cols)}
+
+    cells = sum(frame.size for frame in frames.values())
+    blob = pickle.dumps(frames, protocol=5)
+    records_current, records_peak = measure(blob, records_layout)
+    columnar_current, columnar_peak = measure(blob, SheetData)
+
+    print(json.dumps({
+        'sheets': len(frames),
+        'cells': cells,
+        'records': {'resident_bytes': records_current, 'peak_bytes': records_peak,
+                    'bytes_per_cell': round(records_current / max(cells, 1), 1)},
+        'columnar': {'resident_bytes': columnar_current, 'peak_bytes': columnar_peak,
+                     'bytes_per_cell': round(columnar_current / max(cells, 1), 1)},
+        'reduction': round(records_current / max(columnar_current, 1), 2)
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""加载、序列化、渲染各环节的性能基准
+
+生成指定规模的合成工作簿（文件数 × 工作表数 × 行数 × 列数，含中英文文本、日期、
+空值和混合类型列），分别测量：
+
+    load          load_excel_files 解析全部文件（不使用磁盘缓存）
+    load_cached   load_excel_files 从磁盘缓存读取
+    get_data      /api/data 构建并序列化JSON（每次清空响应缓存）
+    view_sheet    /sheet/<文件>/<工作表> 渲染首屏页面（每次清空响应缓存）
+    static_site   main-github.py 的 create_static_excel_viewer 生成静态页面和各工作表数据文件
+                  （--workers 个进程并行处理工作簿；输出字节数为页面与数据文件之和，
+                  另报告首屏需要的页面+资源+清单字节数）
+    wire_format   /api/data 的 records 与 columnar 两种格式：字节数、gzip后字节数、
+                  编码耗时和解析耗时（Python json.loads；安装了node时另测 JSON.parse）
+    reload_contention
+                  后台线程反复重新加载第一个工作簿时请求 /api/search 与 /api/data 的耗时，
+                  并报告 reload_lock / search_lock 的等待时间（与加载线程的锁争用）
+
+每个环节在独立的子进程中运行，输出耗时 p50/p99、吞吐量和峰值RSS（JSON；该进程与
+其启动的进程池中最大的一个）。
+
+用法:
+    python benchmarks/pipeline.py
+    python benchmarks/pipeline.py --files 4 --sheets 3 --rows 20000 --cols 16 --repeat 5
+    python benchmarks/pipeline.py --stages load get_data --output result.json
+"""
+import os
+import sys
+import json
+import gzip
+import time
+import shutil
+import subprocess
+import argparse
+import platform
+import threading
+import tempfile
+import importlib.util
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CODE_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, CODE_DIR)
+sys.path.insert(0, BENCH_DIR)
+from memory_layout import synthetic_frame  # noqa: E402
+
+STAGES = ('load', 'load_cached', 'get_data', 'view_sheet', 'static_site', 'wire_format', 'reload_contention')
+
+NODE_PARSE_SCRIPT = """
+const body = require('fs').readFileSync(process.argv[1], 'utf8');
+const repeat = parseInt(process.argv[2], 10);
+const timings = [];
+for (let i = 0; i < repeat; i++) {
+    const start = process.hrtime.bigint();
+    JSON.parse(body);
+    timings.push(Number(process.hrtime.bigint() - start) / 1e9);
+}
+console.log(JSON.stringify(timings));
+"""
+
+
+def build_workbooks(folder, files, sheets, rows, cols, seed=0):
+    """在 folder 下生成合成工作簿，返回单元格总数"""
+    os.makedirs(folder, exist_ok=True)
+    cells = 0
+    for f in range(files):
+        path = os.path.join(folder, f"合成数据{f + 1}.xlsx")
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            for s in range(sheets):
+                frame = synthetic_frame(rows, max(cols - 1, 1), seed=seed + f * sheets + s)
+                # 混合类型列：数字、文本、空值交替出现
+                frame['备注'] = pd.Series([7, '待确认', None, 3.5, 'A-100'] * (rows // 5 + 1))[:rows].values
+                frame.to_excel(writer, sheet_name=f"工作表{s + 1}", index=False)
+                cells += frame.size
+    return cells
+
+
+def peak_rss_bytes():
+    """当前进程及其已结束的子进程（进程池）中最大的峰值常驻内存"""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def import_script(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def node_parse_timings(body, repeat):
+    """用node测量浏览器端 JSON.parse 的耗时，未安装node时返回None"""
+    if shutil.which('node') is None:
+        return None
+    with tempfile.NamedTemporaryFile('wb', suffix='.json', delete=False) as f:
+        f.write(body)
+    try:
+        output = subprocess.run(['node', '-e', NODE_PARSE_SCRIPT, f.name, str(repeat)],
+                                capture_output=True, check=True, text=True).stdout
+        return json.loads(output)
+    finally:
+        os.remove(f.name)
+
+
+def reset_state(main):
+    main.snapshot = main.DataSnapshot()
+    main.file_fingerprints.clear()
+    main.search_indexes.clear()
+
+
+def run_stage(stage, workdir, repeat, workers):
+    """在子进程中执行一个环节，返回每次的耗时和处理字节数"""
+    os.chdir(workdir)
+    timings, sizes = [], []
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        import main
+        main.create_templates()
+        main.cache_dir = '.excel_cache' if stage == 'load_cached' else None
+
+        if stage in ('load', 'load_cached'):
+            if stage == 'load_cached':
+                main.load_excel_files('excel_files', workers)  # 预热磁盘缓存
+            for _ in range(repeat):
+                reset_state(main)
+                start = time.perf_counter()
+                main.load_excel_files('excel_files', workers)
+                timings.append(time.perf_counter() - start)
+
+        elif stage in ('get_data', 'view_sheet'):
+            main.load_excel_files('excel_files', workers)
+            client = main.app.test_client()
+            if stage == 'get_data':
+                urls = ['/api/data']
+            else:
+                urls = [f"/sheet/{filename}/{sheet_name}"
+                        for filename, sheets in main.snapshot.excel_data.items() for sheet_name in sheets]
+            for _ in range(repeat):
+                for url in urls:
+                    main.render_cache = main.LRUCache(main.render_cache.max_bytes)
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    timings.append(time.perf_counter() - start)
+                    if response.status_code != 200:
+                        raise RuntimeError(f"{url} 返回 {response.status_code}")
+                    sizes.append(len(response.data))
+
+        elif stage == 'static_site':
+            github = import_script(os.path.join(CODE_DIR, 'main-github.py'), 'main_github')
+            for _ in range(repeat):
+                # 每次都从解析开始：删除磁盘缓存和增量生成记录
+                shutil.rmtree('.excel_cache', ignore_errors=True)
+                shutil.rmtree('docs', ignore_errors=True)
+                start = time.perf_counter()
+                github.create_static_excel_viewer(workers)
+                timings.append(time.perf_counter() - start)
+                data_dir, assets_dir = os.path.join('docs', 'data'), os.path.join('docs', 'assets')
+                first_paint = (os.path.getsize(os.path.join('docs', 'index.html'))
+                               + os.path.getsize(os.path.join('docs', 'manifest.json'))
+                               + sum(os.path.getsize(os.path.join(assets_dir, name)) for name in os.listdir(assets_dir)))
+                sizes.append(first_paint + sum(os.path.getsize(os.path.join(data_dir, name))
+                                               for name in os.listdir(data_dir) if name.endswith('.json')))
+            return {'timings': timings, 'sizes': sizes, 'first_paint_bytes': first_paint,
+                    'peak_rss_bytes': peak_rss_bytes()}
+
+        elif stage == 'wire_format':
+            main.load_excel_files('excel_files', workers)
+            client = main.app.test_client()
+            formats = {}
+            for wire_format in main.WIRE_FORMATS:
+                encode, parse = [], []
+                for _ in range(repeat):
+                    main.render_cache = main.LRUCache(main.render_cache.max_bytes)
+                    start = time.perf_counter()
+                    body = client.get(f"/api/data?format={wire_format}").data
+                    encode.append(time.perf_counter() - start)
+                    start = time.perf_counter()
+                    json.loads(body)
+                    parse.append(time.perf_counter() - start)
+                formats[wire_format] = {
+                    'timings': encode,
+                    'parse': parse,
+                    'node_parse': node_parse_timings(body, repeat),
+                    'bytes': len(body),
+                    'gzip_bytes': len(gzip.compress(body, compresslevel=6))
+                }
+            return {'formats': formats, 'peak_rss_bytes': peak_rss_bytes()}
+
+        elif stage == 'reload_contention':
+            main.load_excel_files('excel_files', workers)
+            client = main.app.test_client()
+            reloaded = os.path.join('excel_files', sorted(main.snapshot.excel_data)[0])
+            stop = threading.Event()
+
+            def reload_loop():
+                # 模拟文件被频繁修改：清除指纹后重新加载（含解析和重建搜索索引）
+                while not stop.is_set():
+                    with main.reload_lock:
+                        main.file_fingerprints.pop(os.path.basename(reloaded), None)
+                    main.load_excel_file(reloaded)
+
+            main.metrics = main.Metrics()  # 只统计本环节的锁等待
+            reloader = threading.Thread(target=reload_loop, daemon=True)
+            reloader.start()
+            try:
+                for _ in range(repeat * 10):
+                    for url in ('/api/search?q=待确认', '/api/data'):
+                        main.render_cache = main.LRUCache(main.render_cache.max_bytes)
+                        start = time.perf_counter()
+                        response = client.get(url)
+                        timings.append(time.perf_counter() - start)
+                        if response.status_code != 200:
+                            raise RuntimeError(f"{url} 返回 {response.status_code}")
+                        sizes.append(len(response.data))
+            finally:
+                stop.set()
+                reloader.join()
+            return {'timings': timings, 'sizes': sizes, 'locks': main.metrics.summary()['locks'],
+                    'peak_rss_bytes': peak_rss_bytes()}
+
+    return {'timings': timings, 'sizes': sizes, 'peak_rss_bytes': peak_rss_bytes()}
+
+
+def percentile_ms(timings, q):
+    return round(float(np.percentile(timings, q)) * 1000, 2)
+
+
+def summarize_formats(result):
+    """wire_format 环节：各格式的大小与耗时，以及 columnar 相对 records 的比例"""
+    summary = {}
+    for wire_format, data in result['formats'].items():
+        summary[wire_format] = {
+            'bytes': data['bytes'],
+            'gzip_bytes': data['gzip_bytes'],
+            'encode_p50_ms': percentile_ms(data['timings'], 50),
+            'parse_p50_ms': percentile_ms(data['parse'], 50),
+            'node_parse_p50_ms': percentile_ms(data['node_parse'], 50) if data['node_parse'] else None
+        }
+    records, columnar = summary['records'], summary['columnar']
+    summary['columnar_vs_records'] = {
+        key: round(columnar[key] / records[key], 3) if records[key] else None
+        for key in ('bytes', 'gzip_bytes', 'encode_p50_ms', 'parse_p50_ms', 'node_parse_p50_ms')
+        if records[key] is not None
+    }
+    summary['peak_rss_bytes'] = result['peak_rss_bytes']
+    return summary
+
+
+def summarize(result, cells):
+    if 'formats' in result:
+        return summarize_formats(result)
+    timings = np.array(result['timings'])
+    summary = {
+        'runs': len(timings),
+        'p50_ms': percentile_ms(timings, 50),
+        'p99_ms': percentile_ms(timings, 99),
+        'mean_ms': round(float(timings.mean()) * 1000, 2),
+        'peak_rss_bytes': result['peak_rss_bytes']
+    }
+    total_seconds = float(timings.sum())
+    if result['sizes']:
+        summary['output_bytes'] = int(np.median(result['sizes']))
+        summary['throughput_mb_per_s'] = round(sum(result['sizes']) / total_seconds / 1024 / 1024, 2)
+    if 'first_paint_bytes' in result:
+        summary['first_paint_bytes'] = result['first_paint_bytes']
+    elif 'locks' in result:
+        summary['lock_wait'] = result['locks']
+    else:
+        summary['throughput_cells_per_s'] = round(cells * len(timings) / total_seconds)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="加载/序列化/渲染性能基准")
+    parser.add_argument('--files', type=int, default=2)
+    parser.add_argument('--sheets', type=int, default=2)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--cols', type=int, default=12)
+    parser.add_argument('--repeat', type=int, default=5, help="每个环节重复次数")
+    parser.add_argument('--workers', type=int, default=1, help="load_excel_files / 静态网站生成的并行进程数")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--workdir', help="工作目录，默认使用临时目录并在结束后删除")
+    parser.add_argument('--output', help="结果写入文件，默认输出到标准输出")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='excel-viewer-bench-')
+    try:
+        stages = {}
+        context = multiprocessing.get_context('spawn')  # 每个环节一个全新进程，峰值RSS互不影响
+
+        # 合成工作簿也在单独的进程中生成：子进程的峰值RSS会继承创建它时主进程的峰值
+        start = time.perf_counter()
+        with ProcessPoolExecutor(1, mp_context=context) as pool:
+            cells = pool.submit(build_workbooks, os.path.join(workdir, 'excel_files'),
+                                args.files, args.sheets, args.rows, args.cols, args.seed).result()
+        print(f"生成合成工作簿: {cells} 个单元格，耗时 {time.perf_counter() - start:.1f}秒", file=sys.stderr)
+        for stage in args.stages:
+            print(f"运行: {stage}", file=sys.stderr)
+            # 进程池的工作进程不是守护进程，环节内部还可以再启动进程池
+            with ProcessPoolExecutor(1, mp_context=context) as pool:
+                try:
+                    result = pool.submit(run_stage, stage, workdir, args.repeat, args.workers).result()
+                    stages[stage] = summarize(result, cells)
+                except Exception as e:
+                    stages[stage] = {'error': f"{type(e).__name__}: {e}"}
+
+        report = {
+            'config': {
+                'files': args.files, 'sheets': args.sheets, 'rows': args.rows, 'cols': args.cols,
+                'cells': cells, 'repeat': args.repeat, 'workers': args.workers, 'seed': args.seed
+            },
+            'environment': {
+                'python': platform.python_version(),
+                'pandas': pd.__version__,
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count()
+            },
+            'stages': stages
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+        print(output)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
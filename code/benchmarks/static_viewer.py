@@ -0,0 +1,76 @@
+"""静态查看器的滚动基准页面
+
+生成一个含大工作表的合成静态网站（main-github.py 的 create_static_excel_viewer），
+并在本地启动HTTP服务。用浏览器打开输出的地址（带 ?bench）后，页面会自动打开行数最多的
+工作表，从顶部逐帧滚动到底部，在右下角显示帧间隔（p50/p95/最长帧/掉帧数）、
+每帧渲染耗时和表格中实际存在的DOM行数；结果同时写入 window.benchmarkResult。
+
+用法:
+    python benchmarks/static_viewer.py
+    python benchmarks/static_viewer.py --rows 50000 --cols 20 --port 8001
+    python benchmarks/static_viewer.py --workdir /tmp/viewer-bench --no-serve
+"""
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+import functools
+import contextlib
+import http.server
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CODE_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, CODE_DIR)
+sys.path.insert(0, BENCH_DIR)
+from pipeline import build_workbooks, import_script  # noqa: E402
+
+
+def build_site(workdir, rows, cols, seed=0):
+    """生成合成工作簿和静态网站，返回网站目录"""
+    cells = build_workbooks(os.path.join(workdir, 'excel_files'), 1, 1, rows, cols, seed)
+    print(f"生成合成工作簿: {rows} 行 × {cols} 列，{cells} 个单元格", file=sys.stderr)
+
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        github = import_script(os.path.join(CODE_DIR, 'main-github.py'), 'main_github')
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            github.create_static_excel_viewer()
+    finally:
+        os.chdir(cwd)
+    return os.path.join(workdir, 'docs')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="静态查看器滚动基准页面")
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--cols', type=int, default=12)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workdir', help="工作目录，默认使用临时目录，启动了HTTP服务时在结束后删除")
+    parser.add_argument('--no-serve', action='store_true', help="只生成网站，不启动HTTP服务（保留生成的目录）")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='excel-viewer-scroll-')
+    try:
+        site_dir = build_site(workdir, args.rows, args.cols, args.seed)
+        if args.no_serve:
+            print(f"静态网站已生成: {site_dir}")
+            return
+
+        handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=site_dir)
+        with http.server.ThreadingHTTPServer(('127.0.0.1', args.port), handler) as server:
+            print(f"在浏览器中打开 http://127.0.0.1:{args.port}/?bench 查看帧耗时，Ctrl+C 结束")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+    finally:
+        # 只生成不服务时保留临时目录，输出的路径之后仍然可用
+        if not args.workdir and not args.no_serve:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""JSON序列化
+
+按可用性选择后端：orjson > msgspec > 标准库json，也可用环境变量 EXCEL_VIEWER_JSON 指定。
+所有后端都能处理表格数据中混入的 pandas/NumPy 类型（Timestamp、NaT、numpy 整数/浮点数等）。
+
+表格行数据不经过 to_dict('records') 生成行字典：每一列按类型整体转换为JSON片段列表，
+再按预先生成的行模板拼接，得到的 RawJSON 可直接嵌入任意后端输出的JSON中。
+空值（NaN、None、NaT、pd.NA）输出为空字符串，日期时间输出为 str(Timestamp) 的文本
+（如 "2024-01-01 00:00:00"），与服务端渲染的首屏页面显示一致。
+
+行有两种编码：records 为 {"列名":值,...}；columnar 为 [值,...]，列名只在外层的
+columns 中出现一次，宽表可省去一半以上的字节。
+"""
+import os
+import json
+import uuid
+import datetime
+from json.encoder import encode_basestring
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+EMPTY = '""'
+
+
+def _default_backend():
+    requested = os.environ.get('EXCEL_VIEWER_JSON')
+    if requested in ('orjson', 'msgspec', 'json'):
+        if requested == 'json' or globals()[requested] is not None:
+            return requested
+    if orjson is not None:
+        return 'orjson'
+    if msgspec is not None:
+        return 'msgspec'
+    return 'json'
+
+
+BACKEND = _default_backend()
+
+
+class RawJSON:
+    """已编码的JSON文本，序列化时原样嵌入"""
+
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+    def __str__(self):
+        return self.text
+
+
+def to_builtin(value):
+    """把标准JSON不支持的类型转换为可序列化的值"""
+    if value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time, pd.Timedelta)):
+        return str(value)  # 与页面中显示的文本一致
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def _orjson_default(value):
+    if isinstance(value, RawJSON):
+        return orjson.Fragment(value.text)
+    return to_builtin(value)
+
+
+def _msgspec_hook(value):
+    if isinstance(value, RawJSON):
+        return msgspec.Raw(value.text.encode('utf-8'))
+    return to_builtin(value)
+
+
+if msgspec is not None:
+    _msgspec_encoder = msgspec.json.Encoder(enc_hook=_msgspec_hook)
+
+
+def dumps(obj, indent=False):
+    """序列化为UTF-8字节串；indent=True 时缩进输出（RawJSON 片段保持紧凑）"""
+    if BACKEND == 'orjson':
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if hasattr(orjson, 'Fragment'):
+            return orjson.dumps(obj, default=_orjson_default, option=option)
+        return _dumps_with_placeholders(lambda default: orjson.dumps(obj, default=default, option=option))
+
+    if BACKEND == 'msgspec':
+        body = _msgspec_encoder.encode(obj)
+        return msgspec.json.format(body, indent=2) if indent else body
+
+    return _dumps_with_placeholders(lambda default: json.dumps(
+        obj, ensure_ascii=False, default=default,
+        indent=2 if indent else None, separators=None if indent else (',', ':')).encode('utf-8'))
+
+
+def _dumps_with_placeholders(encode):
+    """后端不支持原样嵌入时（标准库、orjson 3.9以前）：先用占位字符串代替片段，编码后再替换回去"""
+    fragments = []
+    token = uuid.uuid4().hex
+
+    def default(value):
+        if isinstance(value, RawJSON):
+            fragments.append(value.text)
+            return f"{token}{len(fragments) - 1}"
+        return to_builtin(value)
+
+    body = encode(default)
+    if not fragments:
+        return body
+    parts = body.split(f'"{token}'.encode('ascii'))
+    chunks = [parts[0]]
+    for part in parts[1:]:
+        index, rest = part.split(b'"', 1)
+        chunks.append(fragments[int(index)].encode('utf-8'))
+        chunks.append(rest)
+    return b''.join(chunks)
+
+
+def _encode_value(value):
+    """单个单元格值的JSON片段（混合类型列逐个处理）"""
+    if value is None or value is pd.NaT or value is pd.NA:
+        return EMPTY
+    if isinstance(value, str):
+        return encode_basestring(value)
+    if isinstance(value, (bool, np.bool_)):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    if isinstance(value, (float, np.floating)):
+        return _encode_float(float(value))
+    return encode_basestring(str(value))
+
+
+def _encode_float(value):
+    text = repr(value)
+    if text == 'nan':
+        return EMPTY
+    if text in ('inf', '-inf'):
+        return 'null'  # JSON没有无穷大
+    return text
+
+
+def encode_column(series):
+    """把一列转换为JSON片段列表，按数据类型整体处理"""
+    kind = series.dtype.kind
+    if kind == 'M':
+        # 与 str(Timestamp) 一致：零点也保留时间部分，空值为空字符串
+        if series.dt.tz is None and not (series.dt.microsecond.any() or series.dt.nanosecond.any()):
+            text = series.dt.strftime('%Y-%m-%d %H:%M:%S')
+        else:
+            text = series.map(str, na_action='ignore')
+        return list(map(encode_basestring, text.where(series.notna(), '').tolist()))
+    if isinstance(series.dtype, pd.api.extensions.ExtensionDtype) and series.hasnans:
+        # 可空整数/浮点/布尔/字符串列：pd.NA 不能直接编码，逐个处理
+        return list(map(_encode_value, series.astype(object).tolist()))
+    values = series.tolist()
+    if kind in 'iu':
+        return list(map(str, values))
+    if kind == 'b':
+        return ['true' if value else 'false' for value in values]
+    if kind == 'f':
+        return list(map(_encode_float, values))
+    if pd.api.types.infer_dtype(values, skipna=False) == 'string':
+        return list(map(encode_basestring, values))  # 纯文本列，不含空值
+    return list(map(_encode_value, values))
+
+
+def _row_template(columns):
+    keys = [encode_basestring(str(column)) for column in columns]
+    parts = [('{' if i == 0 else ',') + key + ':' for i, key in enumerate(keys)]
+    return ''.join(part.replace('{', '{{').replace('}', '}}') + '{}' for part in parts) + '}}'
+
+
+def record_fragments(frame):
+    """每行一个 {"列名":值,...} 片段"""
+    if not len(frame.columns):
+        return ['{}'] * len(frame)
+    template = _row_template(frame.columns)
+    columns = [encode_column(frame.iloc[:, i]) for i in range(frame.shape[1])]
+    return list(map(template.format, *columns))
+
+
+def records_json(frame):
+    """每行一个 {"列名":值} 对象的JSON数组，空值为空字符串"""
+    return RawJSON('[' + ','.join(record_fragments(frame)) + ']')
+
+
+def array_fragments(frame):
+    """每行一个 [值,...] 片段，值的顺序与 frame.columns 一致"""
+    if not len(frame.columns):
+        return ['[]'] * len(frame)
+    template = '[' + ','.join(['{}'] * frame.shape[1]) + ']'
+    columns = [encode_column(frame.iloc[:, i]) for i in range(frame.shape[1])]
+    return list(map(template.format, *columns))
+
+
+def arrays_json(frame):
+    """columnar 格式的行数据：二维数组"""
+    return RawJSON('[' + ','.join(array_fragments(frame)) + ']')
@@ -1,46 +1,20 @@
 # ===== 方案1: 生成静态HTML文件 + 免费托管 =====
 
-import json
 import os
-from datetime import datetime
+
+from static_build import MANIFEST_NAME, build_static_site, write_site
 
 
 def generate_static_website():
     """将Excel数据转换为静态网站"""
 
-    # 1. 读取Excel文件并转换为JSON
+    # 1. 读取Excel文件，每个工作表写成一个数据文件
     def convert_excel_to_static():
-        """转换Excel为静态JSON数据"""
-        excel_data = {}
-        static_data = {
-            'files': {},
-            'generated_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'version': '1.0'
-        }
-
-        # 扫描Excel文件
+        """转换Excel为静态数据文件，返回清单（文件、工作表、行列数和数据文件路径）"""
         excel_folder = "excel_files"
-        if os.path.exists(excel_folder):
-            for filename in os.listdir(excel_folder):
-                if filename.endswith(('.xlsx', '.xls')):
-                    file_path = os.path.join(excel_folder, filename)
-                    try:
-                        import pandas as pd
-                        df = pd.read_excel(file_path, sheet_name=None)
-
-                        static_data['files'][filename] = {}
-                        for sheet_name, sheet_df in df.items():
-                            sheet_df = sheet_df.fillna('')
-                            static_data['files'][filename][sheet_name] = {
-                                'data': sheet_df.to_dict('records'),
-                                'columns': list(sheet_df.columns),
-                                'row_count': len(sheet_df),
-                                'col_count': len(sheet_df.columns)
-                            }
-                    except Exception as e:
-                        print(f"处理文件 {filename} 时出错: {e}")
-
-        return static_data
+        if not os.path.exists(excel_folder):
+            return {'files': {}, 'search': {}}
+        return build_static_site(static_dir, excel_folder)
 
     # 2. 生成静态HTML文件
     def create_static_html(data):
@@ -120,7 +94,7 @@ def generate_static_website():
                         <div class="static-badge">
                             <i class="fas fa-bolt"></i> 静态版本 - 永久访问
                         </div>
-                        <p class="mb-0">数据生成时间: {data['generated_time']}</p>
+                        <p class="mb-0">数据生成时间: {data.get('generated', '')}</p>
                     </div>
                     <div class="card-body">
                         <div id="file-list">
@@ -151,8 +125,34 @@ def generate_static_website():
 
     <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js"></script>
     <script>
-        // 数据嵌入到HTML中
-        const excelData = {json.dumps(data, ensure_ascii=False, indent=2)};
+        // 页面只加载清单，工作表数据在打开时才请求
+        let excelData = {{ files: {{}} }};
+        const sheetRequests = new Map();
+
+        function loadSheet(filename, sheetName) {{
+            const path = excelData.files[filename][sheetName].path;
+            if (!sheetRequests.has(path)) {{
+                sheetRequests.set(path, fetch(path).then(response => {{
+                    if (!response.ok) throw new Error(`HTTP ${{response.status}}`);
+                    return response.json();
+                }}).catch(error => {{
+                    sheetRequests.delete(path);  // 失败后允许重试
+                    throw error;
+                }}));
+            }}
+            return sheetRequests.get(path);
+        }}
+
+        // 文件名、工作表名和单元格内容都来自Excel，写入HTML前转义
+        function escapeHtml(value) {{
+            return String(value).replace(/[&<>"']/g, ch => ({{ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }})[ch]);
+        }}
+
+        // 工作表名放在 data- 属性中，由点击监听读取，名称中有引号也不会破坏脚本
+        document.addEventListener('click', event => {{
+            const link = event.target.closest('[data-sheet]');
+            if (link) showSheet(link.dataset.file, link.dataset.sheet);
+        }});
 
         // 生成文件列表
         function generateFileList() {{
@@ -176,7 +176,7 @@ def generate_static_website():
                     <div class="file-item">
                         <div class="d-flex justify-content-between align-items-start">
                             <div class="flex-grow-1">
-                                <h4><i class="fas fa-file-excel text-success"></i> ${{filename}}</h4>
+                                <h4><i class="fas fa-file-excel text-success"></i> ${{escapeHtml(filename)}}</h4>
                                 <p class="text-muted mb-2">
                                     <i class="fas fa-layer-group"></i> 工作表数量: ${{Object.keys(sheets).length}}
                                 </p>
@@ -185,10 +185,10 @@ def generate_static_website():
 
                 for (const [sheetName, sheetData] of Object.entries(sheets)) {{
                     html += `
-                        <div class="sheet-info" onclick="showSheet('${{filename}}', '${{sheetName}}')">
+                        <div class="sheet-info" data-file="${{escapeHtml(filename)}}" data-sheet="${{escapeHtml(sheetName)}}">
                             <div class="d-flex justify-content-between align-items-center">
                                 <div>
-                                    <strong><i class="fas fa-table text-primary"></i> ${{sheetName}}</strong>
+                                    <strong><i class="fas fa-table text-primary"></i> ${{escapeHtml(sheetName)}}</strong>
                                     <span class="text-muted ms-2">
                                         ${{sheetData.row_count}} 行 × ${{sheetData.col_count}} 列
                                     </span>
@@ -211,14 +211,35 @@ def generate_static_website():
         }}
 
         // 显示工作表数据
-        function showSheet(filename, sheetName) {{
-            const sheetData = excelData.files[filename][sheetName];
+        async function showSheet(filename, sheetName) {{
             const modalTitle = document.getElementById('modalTitle');
             const tableContainer = document.getElementById('tableContainer');
+            const modal = bootstrap.Modal.getOrCreateInstance(document.getElementById('dataModal'));
 
             modalTitle.textContent = `${{filename}} - ${{sheetName}}`;
+            tableContainer.innerHTML = `
+                <div class="text-center py-5">
+                    <div class="spinner-border text-primary"></div>
+                    <p class="mt-3">加载中...</p>
+                </div>
+            `;
+            modal.show();
 
-            if (sheetData.data.length === 0) {{
+            let sheetData;
+            try {{
+                sheetData = await loadSheet(filename, sheetName);
+            }} catch (error) {{
+                tableContainer.innerHTML = `
+                    <div class="text-center py-5">
+                        <i class="fas fa-exclamation-triangle fa-3x text-danger"></i>
+                        <h4>数据加载失败</h4>
+                        <p class="text-muted">${{escapeHtml(error.message)}}</p>
+                    </div>
+                `;
+                return;
+            }}
+
+            if (sheetData.rows.length === 0) {{
                 tableContainer.innerHTML = `
                     <div class="text-center py-5">
                         <i class="fas fa-exclamation-triangle fa-3x text-muted"></i>
@@ -235,16 +256,16 @@ def generate_static_website():
 
                 // 表头
                 sheetData.columns.forEach(col => {{
-                    tableHtml += `<th>${{col}}</th>`;
+                    tableHtml += `<th>${{escapeHtml(col)}}</th>`;
                 }});
 
                 tableHtml += '</tr></thead><tbody>';
 
                 // 数据行
-                sheetData.data.forEach((row, index) => {{
+                sheetData.rows.forEach((row, index) => {{
                     tableHtml += `<tr><td>${{index + 1}}</td>`;
-                    sheetData.columns.forEach(col => {{
-                        tableHtml += `<td>${{row[col] || ''}}</td>`;
+                    row.forEach(value => {{
+                        tableHtml += `<td>${{escapeHtml(value ?? '')}}</td>`;  // 空值（含无穷大）显示为空
                     }});
                     tableHtml += '</tr>';
                 }});
@@ -252,14 +273,18 @@ def generate_static_website():
                 tableHtml += '</tbody></table>';
                 tableContainer.innerHTML = tableHtml;
             }}
-
-            // 显示模态框
-            const modal = new bootstrap.Modal(document.getElementById('dataModal'));
-            modal.show();
         }}
 
-        // 页面加载后生成文件列表
-        document.addEventListener('DOMContentLoaded', generateFileList);
+        // 页面加载后读取清单并生成文件列表
+        document.addEventListener('DOMContentLoaded', async () => {{
+            try {{
+                const response = await fetch('manifest.json');
+                if (response.ok) excelData = await response.json();
+            }} catch (error) {{
+                console.warn('清单加载失败:', error);
+            }}
+            generateFileList();
+        }});
     </script>
 </body>
 </html>
@@ -281,9 +306,8 @@ def generate_static_website():
     # 生成HTML
     html_content = create_static_html(data)
 
-    # 写入文件
-    with open(os.path.join(static_dir, 'index.html'), 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    # 写入文件：样式和脚本提取为带内容哈希的资源文件，并生成 Service Worker
+    write_site(static_dir, html_content, MANIFEST_NAME)
 
     print(f"✅ 静态网站已生成到: {static_dir}/index.html")
     print(f"📊 包含 {len(data['files'])} 个Excel文件")
@@ -534,7 +558,8 @@ def main_static():
 
     print(f"\n🎉 完成！静态网站已生成")
     print(f"📁 位置: {static_dir}/")
-    print(f"🌐 本地预览: 打开 {static_dir}/index.html")
+    # 页面通过 fetch 读取清单和数据文件，直接双击打开 (file://) 时浏览器会拦截请求
+    print(f"🌐 本地预览: 在 {static_dir} 目录运行 python -m http.server，然后打开 http://localhost:8000")
     print(f"☁️ 在线部署: 将文件夹上传到任何静态托管平台")
 
     # 生成二维码（使用本地文件地址作为示例）
@@ -1,7 +1,7 @@
 import os
-import pandas as pd
 import qrcode
-from flask import Flask, render_template, jsonify, redirect, url_for
+from flask import Flask, render_template, jsonify, redirect, url_for, request, g, has_request_context
+from flask.json.provider import DefaultJSONProvider
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import threading
@@ -12,25 +12,313 @@ import json
 import subprocess
 import requests
 import sys
+import argparse
+import gzip
+import hashlib
+from collections import OrderedDict
+from types import MappingProxyType
+from concurrent.futures import ProcessPoolExecutor
+
+import json_codec
+from json_codec import RawJSON, arrays_json, record_fragments, records_json
+from metrics import Metrics
+from search_index import WorkbookIndex, query_tokens
+from sheet_query import QueryError, parse_query, run_query
+from sheet_cache import (SheetCache, get_file_fingerprint, read_excel_frames, read_excel_metadata,
+                         read_excel_sheet, STREAMING_THRESHOLD_BYTES)
+
+try:
+    import brotli
+except ImportError:  # 未安装brotli时只使用gzip
+    brotli = None
+
+
+
+class CodecJSONProvider(DefaultJSONProvider):
+    """jsonify 和模板中的 tojson 也使用 json_codec 序列化"""
+
+    sort_keys = False  # 表头可能同时包含数字和文本，不能对键排序
+
+    def dumps(self, obj, **kwargs):
+        return json_codec.dumps(obj).decode('utf-8')
+
 
 app = Flask(__name__)
+app.json = CodecJSONProvider(app)
+
+
+
+class DataSnapshot:
+    """某一时刻的完整表格数据快照
+
+    构建后不再修改：加载方在旁边构建新快照，再通过一次引用赋值发布；
+    每个请求只读取开始时拿到的那份快照，不需要加锁，也不会看到不一致的状态。
+    """
+
+    __slots__ = ('excel_data', 'last_modified', 'file_versions', 'version')
+
+    def __init__(self, excel_data=None, last_modified=None, file_versions=None, version=0):
+        self.excel_data = MappingProxyType(excel_data or {})  # 文件名 -> {工作表名: SheetData}
+        self.last_modified = MappingProxyType(last_modified or {})
+        self.file_versions = MappingProxyType(file_versions or {})  # 文件名 -> 该文件最近一次变化时的全局版本号
+        self.version = version  # 全局数据版本号，任何文件变化都会递增
+
+    def with_file(self, filename, sheets, modified):
+        """返回新增或替换一个文件后的新快照"""
+        version = self.version + 1
+        excel_data = dict(self.excel_data)
+        excel_data[filename] = MappingProxyType(sheets)
+        last_modified = dict(self.last_modified)
+        last_modified[filename] = modified
+        file_versions = dict(self.file_versions)
+        file_versions[filename] = version
+        return DataSnapshot(excel_data, last_modified, file_versions, version)
+
+    def without_file(self, filename):
+        """返回移除一个文件后的新快照"""
+        excel_data = dict(self.excel_data)
+        del excel_data[filename]
+        last_modified = dict(self.last_modified)
+        last_modified.pop(filename, None)
+        file_versions = dict(self.file_versions)
+        file_versions.pop(filename, None)
+        return DataSnapshot(excel_data, last_modified, file_versions, self.version + 1)
+
+
+class TimedLock:
+    """记录等待时间的锁：每次阻塞获取的等待时间按锁名计入 metrics，用于观察与加载线程的争用"""
+
+    __slots__ = ('name', '_lock')
+
+    def __init__(self, name, lock):
+        self.name = name
+        self._lock = lock
+
+    def acquire(self, blocking=True, timeout=-1):
+        start = time.perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired and blocking:
+            metrics.observe_lock_wait(self.name, time.perf_counter() - start)
+        return acquired
+
+    def release(self):
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
 
 # 全局变量存储表格数据
-excel_data = {}
-last_modified = {}
+snapshot = DataSnapshot()  # 当前发布的数据快照，只会被整体替换
+file_fingerprints = {}  # 文件名 -> (修改时间, 大小, 内容哈希)，只在持有 reload_lock 时读写
+reload_lock = TimedLock('reload', threading.RLock())  # 串行化所有加载/移除操作；读取方不需要加锁
 public_url = None
+reload_worker = None
+cache_dir = None  # 解析结果磁盘缓存目录，None表示不使用缓存
+streaming_threshold = STREAMING_THRESHOLD_BYTES  # 超过此大小的文件使用流式读取
+lazy_mode = False  # 按需加载：启动时只读工作表尺寸，首次访问时才解析单元格
+excel_folder = "excel_files"
+
+# 多进程部署：启动进程负责监控文件并写共享状态文件，其余工作进程跟随该文件从磁盘缓存载入数据
+SHARED_STATE_FILE = "shared_state.json"
+shared_state_path = os.environ.get('EXCEL_VIEWER_SHARED_STATE')
+state_follower = shared_state_path is not None  # uvicorn 工作进程通过环境变量得知自己是跟随方
+shared_state_seen = None  # 已同步的共享状态文件 (修改时间, 大小)
+shared_state_checked = 0.0
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+WIRE_FORMATS = ('records', 'columnar')  # 接口行数据格式：行对象 / 二维数组
+SHEET_PAGE_SIZE = 200  # 页面首屏渲染及每次滚动加载的行数
+MAX_PAGE_SIZE = 1000  # 分页接口单次最多返回的行数
+RENDER_CACHE_MB = 64  # 渲染结果缓存默认内存上限
+QUERY_CACHE_MB = 64  # 查询结果缓存默认内存上限
+LAZY_CACHE_MB = 256  # 按需加载模式下已解析工作表的默认内存上限
+
+# 进程启动标识：重启后版本号从头计数，ETag需要与上次运行区分开
+instance_token = f"{os.getpid()}-{time.time()}"
+
+
+def is_excel_file(path):
+    """判断是否为需要加载的Excel文件（忽略Office临时锁文件）"""
+    name = os.path.basename(path)
+    return name.endswith(EXCEL_EXTENSIONS) and not name.startswith('~$')
 
 
 class ExcelFileHandler(FileSystemEventHandler):
-    """监控Excel文件变化的处理器"""
+    """监控Excel文件变化的处理器，事件交给后台重载线程合并处理"""
 
-    def __init__(self, excel_folder):
+    def __init__(self, excel_folder, worker):
         self.excel_folder = excel_folder
+        self.worker = worker
+
+    def on_created(self, event):
+        if not event.is_directory and is_excel_file(event.src_path):
+            self.worker.submit(event.src_path)
 
     def on_modified(self, event):
-        if not event.is_directory and event.src_path.endswith(('.xlsx', '.xls')):
-            print(f"检测到文件变化: {event.src_path}")
-            load_excel_files()
+        if not event.is_directory and is_excel_file(event.src_path):
+            self.worker.submit(event.src_path)
+
+    def on_deleted(self, event):
+        if not event.is_directory and is_excel_file(event.src_path):
+            self.worker.submit(event.src_path)
+
+    def on_moved(self, event):
+        if event.is_directory:
+            return
+        if is_excel_file(event.src_path):
+            self.worker.submit(event.src_path)
+        if is_excel_file(event.dest_path):
+            self.worker.submit(event.dest_path)
+
+
+class ReloadWorker(threading.Thread):
+    """后台重载线程：同一文件在静默期内的多次事件只触发一次解析"""
+
+    def __init__(self, debounce=1.0):
+        super().__init__(name="excel-reloader", daemon=True)
+        self.debounce = debounce
+        self._pending = {}  # 文件路径 -> 最近一次事件时间
+        self._condition = threading.Condition()
+        self._stopped = False
+        self.events_received = 0
+        self.reloads_executed = 0
+
+    def submit(self, path):
+        """登记文件事件，静默期内重复登记只会推迟处理时间"""
+        with self._condition:
+            self.events_received += 1
+            self._pending[path] = time.monotonic()
+            self._condition.notify()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def stats(self):
+        """事件与重载计数"""
+        with self._condition:
+            return {
+                'events_received': self.events_received,
+                'reloads_executed': self.reloads_executed,
+                'pending': len(self._pending),
+                'debounce_seconds': self.debounce
+            }
+
+    def _next_batch(self):
+        """等待并取出已过静默期的文件路径，停止时返回None"""
+        with self._condition:
+            while not self._stopped:
+                if not self._pending:
+                    self._condition.wait()
+                    continue
+                now = time.monotonic()
+                due = [path for path, seen in self._pending.items() if now - seen >= self.debounce]
+                if due:
+                    for path in due:
+                        del self._pending[path]
+                    return due
+                self._condition.wait(min(self._pending.values()) + self.debounce - now)
+            return None
+
+    def run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            for path in batch:
+                print(f"检测到文件变化: {path}")
+                try:
+                    if os.path.exists(path):
+                        load_excel_file(path)
+                    else:
+                        remove_excel_file(os.path.basename(path))
+                        if cache_dir:
+                            SheetCache(cache_dir).discard(path)
+                except Exception as e:
+                    print(f"重新加载 {path} 时出错: {str(e)}")
+                with self._condition:
+                    self.reloads_executed += 1
+            try:
+                write_shared_state()  # 每批只写一次
+            except Exception as e:
+                print(f"写入共享状态失败: {str(e)}")
+
+
+class LRUCache:
+    """按字节数限制容量的LRU缓存（用于渲染结果和按需加载的工作表）
+
+    键为 (文件名, 工作表名, 数据版本号, ...)，文件名为None表示依赖全部文件的条目。
+    按最近最少使用淘汰并限制总字节数；文件重新加载或删除时精确清除相关条目。
+    """
+
+    def __init__(self, max_bytes=RENDER_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # 键 -> (值, 字节数)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, value, size):
+        """写入或替换条目，超出内存上限时淘汰最久未用的条目"""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+
+    def invalidate(self, filename):
+        """清除某个文件的条目以及依赖全部文件的条目"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in (filename, None)]:
+                self.total_bytes -= self._entries.pop(key)[1]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None
+            }
+
+
+render_cache = LRUCache()
+loaded_sheets = LRUCache(LAZY_CACHE_MB * 1024 * 1024)  # 按需加载模式下已解析的工作表
+query_results = LRUCache(QUERY_CACHE_MB * 1024 * 1024)  # 查询接口的结果DataFrame（分页前）
+metrics = Metrics()
+search_indexes = {}  # 文件名 -> (文件版本号, WorkbookIndex)
+search_lock = TimedLock('search', threading.Lock())
+SEARCH_PAGE_SIZE = 20
 
 
 def get_local_ip():
@@ -114,45 +402,456 @@ def start_ngrok(port):
         return None, None
 
 
-def load_excel_files(folder_path="excel_files"):
-    """加载Excel文件并转换为数据"""
-    global excel_data, last_modified
+def record_rows(count):
+    """累计当前请求渲染或序列化的行数，请求结束时计入指标"""
+    if has_request_context():
+        g.rows_rendered = g.get('rows_rendered', 0) + count
+
 
-    if not os.path.exists(folder_path):
-        os.makedirs(folder_path)
-        print(f"创建了文件夹: {folder_path}")
+class SheetData:
+    """列式存储的工作表
+
+    数据保存在DataFrame中（数值列保持NumPy数组），
+    只在渲染或序列化某一段行时才生成行字典。
+    """
+
+    __slots__ = ('frame', 'columns', 'row_count', 'col_count')
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.columns = list(frame.columns)
+        self.row_count = len(frame)
+        self.col_count = len(frame.columns)
+
+    def rows(self, offset=0, limit=None):
+        """生成一段行字典，空值（含 NaT、pd.NA）填充为空字符串，与 json_codec 的输出一致"""
+        stop = None if limit is None else offset + limit
+        frame = self.frame.iloc[offset:stop]
+        records = frame.astype(object).where(frame.notna(), '').to_dict('records')
+        record_rows(len(records))
+        return records
+
+    def rows_json(self, offset=0, limit=None, wire_format='records'):
+        """一段行数据直接按列编码为JSON数组，不生成行字典"""
+        stop = None if limit is None else offset + limit
+        frame = self.frame.iloc[offset:stop]
+        record_rows(len(frame))
+        return arrays_json(frame) if wire_format == 'columnar' else records_json(frame)
+
+    def to_dict(self, offset=0, limit=None, wire_format='records'):
+        """转换为接口使用的结构，行数据为已编码的JSON
+
+        records: {'data': [{列名: 值}], 'columns', 'row_count', 'col_count'}
+        columnar: {'columns', 'rows': [[值, ...]], 'row_count', 'col_count'}
+        """
+        rows_key = 'rows' if wire_format == 'columnar' else 'data'
+        return {
+            rows_key: self.rows_json(offset, limit, wire_format),
+            'columns': self.columns,
+            'row_count': self.row_count,
+            'col_count': self.col_count
+        }
+
+
+class LazySheetData(SheetData):
+    """按需加载的工作表
+
+    创建时只有工作表尺寸，首次访问数据时才解析单元格。解析结果放在大小受限的
+    loaded_sheets 缓存中，被淘汰后再次访问会重新解析；超过缓存上限的工作表不进入缓存，
+    只在当前请求内保留，同一请求多次访问只解析一次。
+    """
+
+    __slots__ = ('file_path', 'sheet_name', 'cache_key', 'dimensions', '_lock')
+
+    def __init__(self, file_path, sheet_name, fingerprint, dimensions):
+        self.file_path = file_path
+        self.sheet_name = sheet_name
+        self.cache_key = (os.path.basename(file_path), sheet_name, fingerprint[2])
+        self.dimensions = dimensions  # (行数, 列数)，来自工作表的dimension记录
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self.cache_key in loaded_sheets
+
+    @property
+    def frame(self):
+        frame = loaded_sheets.get(self.cache_key)
+        if frame is not None:
+            return frame
+        oversized = g.setdefault('oversized_sheets', {}) if has_request_context() else {}
+        frame = oversized.get(self.cache_key)
+        if frame is None:
+            with self._lock:
+                frame = loaded_sheets.get(self.cache_key)
+                if frame is None:
+                    print(f"按需加载工作表: {self.cache_key[0]} / {self.sheet_name}")
+                    frame = read_excel_sheet(self.file_path, self.sheet_name, streaming_threshold)
+                    size = int(frame.memory_usage(deep=True).sum())
+                    if size > loaded_sheets.max_bytes:
+                        oversized[self.cache_key] = frame
+                    else:
+                        loaded_sheets.put(self.cache_key, frame, size)
+        return frame
+
+    @property
+    def columns(self):
+        return list(self.frame.columns)
+
+    @property
+    def row_count(self):
+        return len(self.frame) if self.loaded else self.dimensions[0]
+
+    @property
+    def col_count(self):
+        return len(self.frame.columns) if self.loaded else self.dimensions[1]
+
+
+def build_lazy_sheets(file_path, fingerprint):
+    """按需加载模式：只读取工作表尺寸；不支持的格式返回None"""
+    metadata = read_excel_metadata(file_path)
+    if metadata is None:
+        return None
+    return {sheet_name: LazySheetData(file_path, sheet_name, fingerprint, dimensions)
+            for sheet_name, dimensions in metadata.items()}
+
+
+def parse_excel_file(file_path, fingerprint=None, cache_dir=None, streaming_threshold=None):
+    """解析单个Excel文件的所有工作表，指定缓存目录时优先读取磁盘缓存"""
+    if cache_dir and fingerprint:
+        frames = SheetCache(cache_dir).load(file_path, fingerprint, streaming_threshold)
+    else:
+        frames = read_excel_frames(file_path, streaming_threshold)
+
+    return {sheet_name: SheetData(frame) for sheet_name, frame in frames.items()}
+
+
+def load_search_index(file_path, sheets, fingerprint=None, cache_dir=None):
+    """取工作簿的搜索索引，指定缓存目录时优先读取磁盘缓存，未命中时构建并写入缓存"""
+    cache = SheetCache(cache_dir) if cache_dir and fingerprint else None
+    index = cache.get_index(file_path, fingerprint) if cache else None
+    if index is None:
+        index = WorkbookIndex({sheet_name: sheet_data.frame for sheet_name, sheet_data in sheets.items()})
+        if cache:
+            cache.put_index(file_path, fingerprint, index)
+    return index
+
+
+def parse_excel_file_timed(file_path, fingerprint=None, cache_dir=None, streaming_threshold=None):
+    """进程池使用：返回 (解析结果, 搜索索引, 耗时秒数)
+
+    搜索索引也在工作进程中取得，主进程不必在进程池返回后再逐个文件构建。
+    """
+    start = time.perf_counter()
+    sheets = parse_excel_file(file_path, fingerprint, cache_dir, streaming_threshold)
+    index = load_search_index(file_path, sheets, fingerprint, cache_dir)
+    return sheets, index, time.perf_counter() - start
+
+
+def check_excel_file(file_path):
+    """检查文件是否需要重新解析，需要时返回新指纹，否则返回None"""
+    filename = os.path.basename(file_path)
+    previous = file_fingerprints.get(filename)
+
+    try:
+        fingerprint = get_file_fingerprint(file_path, previous)
+    except OSError:
+        # 文件在事件到达前已被删除或改名
+        remove_excel_file(filename)
+        return None
+
+    if previous and filename in snapshot.excel_data and previous[2] == fingerprint[2]:
+        file_fingerprints[filename] = fingerprint
+        return None
+    return fingerprint
+
+
+def invalidate_file_caches(filename):
+    """文件变化后清除它在各个内存缓存中的条目"""
+    render_cache.invalidate(filename)
+    loaded_sheets.invalidate(filename)
+    query_results.invalidate(filename)
+
+
+def publish_excel_file(filename, sheets, fingerprint, index=None):
+    """发布解析结果：构建包含新工作簿的快照后一次性替换，读取方不会看到半成品数据
+
+    index 为已取得的搜索索引；按需加载模式下为None，第一次搜索时再建立。
+    """
+    global snapshot
+    modified = datetime.fromtimestamp(fingerprint[0] / 1e9).strftime('%Y-%m-%d %H:%M:%S')
+    with reload_lock:
+        snapshot = snapshot.with_file(filename, sheets, modified)
+        file_fingerprints[filename] = fingerprint
+        if index is not None:
+            with search_lock:
+                search_indexes[filename] = (snapshot.file_versions[filename], index)
+    invalidate_file_caches(filename)
+    print(f"成功加载: {filename}")
+    if index is not None:
+        print(f"已建立搜索索引: {filename} ({index.cell_count} 个单元格, {len(index.vocabulary)} 个词)")
+
+
+def load_excel_file(file_path):
+    """增量加载单个Excel文件，内容未变化时跳过解析；返回是否重新加载"""
+    with reload_lock:
+        fingerprint = check_excel_file(file_path)
+        if fingerprint is None:
+            return False
+
+        filename = os.path.basename(file_path)
+        start = time.perf_counter()
+        try:
+            sheets = build_lazy_sheets(file_path, fingerprint) if lazy_mode else None
+            if sheets is None:
+                sheets = parse_excel_file(file_path, fingerprint, cache_dir, streaming_threshold)
+            index = None if lazy_mode else load_search_index(file_path, sheets, fingerprint, cache_dir)
+        except Exception as e:
+            print(f"加载文件 {filename} 时出错: {str(e)}")
+            return False
+
+        publish_excel_file(filename, sheets, fingerprint, index)
+        metrics.observe_reload(filename, time.perf_counter() - start)
+        return True
+
+
+def remove_excel_file(filename):
+    """移除已删除文件的数据"""
+    global snapshot
+    with reload_lock:
+        file_fingerprints.pop(filename, None)
+        removed = filename in snapshot.excel_data
+        if removed:
+            snapshot = snapshot.without_file(filename)
+    if removed:
+        invalidate_file_caches(filename)
+        with search_lock:
+            search_indexes.pop(filename, None)
+        print(f"已移除: {filename}")
+    return removed
+
+
+def get_search_index(snap, filename):
+    """取工作簿的搜索索引，索引对应的文件版本落后于快照时重新构建
+
+    普通模式在加载文件时就建好索引；按需加载模式在第一次搜索时才解析并建索引。
+    """
+    version = snap.file_versions[filename]
+    entry = search_indexes.get(filename)
+    if entry and entry[0] == version:
+        return entry[1]
+
+    with search_lock:
+        entry = search_indexes.get(filename)
+        if entry and entry[0] == version:
+            return entry[1]
+        start = time.time()
+        index = WorkbookIndex({sheet_name: sheet_data.frame
+                               for sheet_name, sheet_data in snap.excel_data[filename].items()})
+        # 加载线程可能已发布了更新的版本或移除了该文件，旧快照建出的索引不覆盖新索引
+        current = search_indexes.get(filename)
+        if filename in snapshot.excel_data and (current is None or current[0] < version):
+            search_indexes[filename] = (version, index)
+        print(f"已建立搜索索引: {filename} ({index.cell_count} 个单元格, "
+              f"{len(index.vocabulary)} 个词, {time.time() - start:.2f}秒)")
+        return index
+
+
+def load_excel_files(folder_path="excel_files", workers=1):
+    """加载Excel文件并转换为数据（仅重新解析有变化的文件）
+
+    workers > 1 时使用进程池并行解析多个工作簿。
+    """
+    global excel_folder
+    excel_folder = folder_path
+
+    with reload_lock:
+        if not os.path.exists(folder_path):
+            os.makedirs(folder_path)
+            print(f"创建了文件夹: {folder_path}")
+            return
+
+        current_files = {filename for filename in os.listdir(folder_path) if is_excel_file(filename)}
+
+        # 清理已不存在的文件
+        for filename in list(snapshot.excel_data):
+            if filename not in current_files:
+                remove_excel_file(filename)
+        if cache_dir:
+            removed = SheetCache(cache_dir).prune(os.path.join(folder_path, filename) for filename in current_files)
+            if removed:
+                print(f"清理了 {removed} 个过期缓存")
+
+        changed = {}
+        for filename in sorted(current_files):
+            fingerprint = check_excel_file(os.path.join(folder_path, filename))
+            if fingerprint is not None:
+                changed[filename] = fingerprint
+
+        workers = min(workers or os.cpu_count() or 1, len(changed))
+        if workers <= 1 or lazy_mode:  # 按需加载模式只读尺寸，不需要进程池
+            for filename in changed:
+                load_excel_file(os.path.join(folder_path, filename))
+        else:
+            print(f"使用 {workers} 个进程并行解析 {len(changed)} 个文件...")
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    filename: executor.submit(parse_excel_file_timed, os.path.join(folder_path, filename),
+                                              changed[filename], cache_dir, streaming_threshold)
+                    for filename in changed
+                }
+                for filename, future in futures.items():
+                    try:
+                        sheets, index, parse_seconds = future.result()
+                    except Exception as e:
+                        print(f"加载文件 {filename} 时出错: {str(e)}")
+                        continue
+                    start = time.perf_counter()
+                    publish_excel_file(filename, sheets, changed[filename], index)
+                    metrics.observe_reload(filename, parse_seconds + time.perf_counter() - start)
+
+        # 整批加载完成后只写一次共享状态，不在每个文件发布时重写
+        write_shared_state()
+
+
+def write_shared_state():
+    """启动进程：把当前数据版本和文件指纹写入共享状态文件，通知其他工作进程
+
+    由 load_excel_files 和 ReloadWorker 在每批文件处理完后调用一次，而不是每个文件调用一次。
+    """
+    if not shared_state_path or state_follower:
         return
 
-    excel_data.clear()
-    last_modified.clear()
+    with reload_lock:
+        snap = snapshot
+        state = {
+            'token': instance_token,
+            'version': snap.version,
+            'public_url': public_url,
+            'config': {'lazy_mode': lazy_mode, 'streaming_threshold': streaming_threshold},
+            'files': {
+                filename: {
+                    'path': os.path.abspath(os.path.join(excel_folder, filename)),
+                    'fingerprint': list(file_fingerprints[filename]),
+                    'version': snap.file_versions[filename],
+                    'last_modified': snap.last_modified[filename]
+                }
+                for filename in snap.excel_data if filename in file_fingerprints
+            }
+        }
+        tmp_path = f"{shared_state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, shared_state_path)
 
-    for filename in os.listdir(folder_path):
-        if filename.endswith(('.xlsx', '.xls')):
-            file_path = os.path.join(folder_path, filename)
-            try:
-                # 读取Excel文件
-                df = pd.read_excel(file_path, sheet_name=None)  # 读取所有工作表
-
-                excel_data[filename] = {}
-                for sheet_name, sheet_df in df.items():
-                    # 填充空值
-                    sheet_df = sheet_df.fillna('')
-
-                    # 转换为更结构化的数据
-                    excel_data[filename][sheet_name] = {
-                        'data': sheet_df.to_dict('records'),
-                        'columns': list(sheet_df.columns),
-                        'row_count': len(sheet_df),
-                        'col_count': len(sheet_df.columns)
-                    }
 
-                # 记录文件修改时间
-                last_modified[filename] = datetime.fromtimestamp(os.path.getmtime(file_path)).strftime(
-                    '%Y-%m-%d %H:%M:%S')
-                print(f"成功加载: {filename}")
+def sync_shared_state(min_interval=1.0):
+    """工作进程：共享状态文件变化时，从磁盘缓存载入启动进程已解析的文件
+
+    最多每 min_interval 秒检查一次文件状态，版本号和ETag标识与启动进程保持一致，
+    这样客户端在不同工作进程间切换也不会误判数据变化。
+    """
+    global snapshot, shared_state_seen, shared_state_checked, instance_token, public_url
+    global cache_dir, lazy_mode, streaming_threshold
+
+    now = time.monotonic()
+    if now - shared_state_checked < min_interval:
+        return
+    shared_state_checked = now
+
+    try:
+        stat = os.stat(shared_state_path)
+    except OSError:
+        return
+    if (stat.st_mtime_ns, stat.st_size) == shared_state_seen:
+        return
+    if not reload_lock.acquire(blocking=False):
+        return  # 其他请求线程正在同步
+
+    try:
+        with open(shared_state_path, encoding='utf-8') as f:
+            state = json.load(f)
+
+        cache_dir = os.path.dirname(shared_state_path)
+        lazy_mode = state['config']['lazy_mode']
+        streaming_threshold = state['config']['streaming_threshold']
+        instance_token = state['token']
+        public_url = state['public_url']
+
+        excel_data, last_modified, file_versions, changed, indexes = {}, {}, {}, [], {}
+        for filename, entry in state['files'].items():
+            fingerprint = tuple(entry['fingerprint'])
+            if file_fingerprints.get(filename) == fingerprint and filename in snapshot.excel_data:
+                sheets = snapshot.excel_data[filename]
+            else:
+                sheets = build_lazy_sheets(entry['path'], fingerprint) if lazy_mode else None
+                if sheets is None:
+                    sheets = parse_excel_file(entry['path'], fingerprint, cache_dir, streaming_threshold)
+                if not lazy_mode:
+                    # 启动进程已把索引写入磁盘缓存，这里直接读取
+                    indexes[filename] = (entry['version'],
+                                         load_search_index(entry['path'], sheets, fingerprint, cache_dir))
+                file_fingerprints[filename] = fingerprint
+                changed.append(filename)
+            excel_data[filename] = sheets
+            last_modified[filename] = entry['last_modified']
+            file_versions[filename] = entry['version']
+
+        removed = [filename for filename in snapshot.excel_data if filename not in excel_data]
+        for filename in removed:
+            file_fingerprints.pop(filename, None)
+
+        snapshot = DataSnapshot(excel_data, last_modified, file_versions, state['version'])
+        for filename in changed + removed:
+            invalidate_file_caches(filename)
+        with search_lock:
+            for filename in removed:
+                search_indexes.pop(filename, None)
+            search_indexes.update(indexes)
+        shared_state_seen = (stat.st_mtime_ns, stat.st_size)
+        if changed or removed:
+            print(f"[{os.getpid()}] 已同步数据版本 {state['version']}")
+    except Exception as e:
+        print(f"[{os.getpid()}] 同步共享状态失败: {str(e)}")
+    finally:
+        reload_lock.release()
 
-            except Exception as e:
-                print(f"加载文件 {filename} 时出错: {str(e)}")
+
+def become_follower():
+    """gunicorn 工作进程fork后调用：重建可能在fork时被占用的锁和缓存，之后跟随共享状态文件"""
+    global state_follower, reload_lock, search_lock, render_cache, loaded_sheets, query_results, metrics, reload_worker
+    state_follower = True
+    reload_lock = TimedLock('reload', threading.RLock())
+    search_lock = TimedLock('search', threading.Lock())
+    render_cache = LRUCache(render_cache.max_bytes)
+    loaded_sheets = LRUCache(loaded_sheets.max_bytes)
+    query_results = LRUCache(query_results.max_bytes)
+    metrics = Metrics()
+    reload_worker = None  # 文件监控只在启动进程中运行
+
+
+@app.before_request
+def start_request_timer():
+    """记录请求开始时间；在同步共享状态之前注册，等待数据同步的时间也计入耗时"""
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """按路由统计耗时、响应字节数和渲染行数"""
+    start = g.get('request_start')
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe_request(route, request.method, response.status_code, time.perf_counter() - start,
+                                response.calculate_content_length() or 0, g.get('rows_rendered', 0))
+    return response
+
+
+@app.before_request
+def follow_shared_state():
+    """多进程部署时，工作进程在处理请求前检查数据是否有更新"""
+    if state_follower:
+        sync_shared_state()
 
 
 def generate_qr_code(url, filename="qr_code.png"):
@@ -186,68 +885,349 @@ def generate_qr_code(url, filename="qr_code.png"):
     print(f"🖨️ 高清打印版二维码: qr_code_print.png")
 
 
+def negotiate_encoding():
+    """根据 Accept-Encoding 选择压缩方式"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_body(body, encoding):
+    """压缩响应体"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def cached_response(cache_key, build, mimetype='text/html'):
+    """按数据版本返回带ETag的响应
+
+    cache_key 形如 (文件名, 工作表名, 数据版本号, ...)。客户端ETag匹配时直接返回304；
+    否则从渲染缓存取出（或渲染并缓存）对应编码的预压缩响应体。响应体不能包含随请求时间变化的内容，
+    页面上的检查时间由浏览器填写。
+    """
+    cache_key = cache_key + (public_url,)  # 公网地址变化后页面和接口中的地址也要更新
+    base_etag = hashlib.sha1(repr((instance_token, cache_key)).encode('utf-8')).hexdigest()[:20]
+    encoding = negotiate_encoding()
+    etag = f"{base_etag}-{encoding}" if encoding else base_etag
+
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        # 条目为 {编码: 响应体}，编码为None表示未压缩
+        variants = render_cache.get(cache_key)
+        if variants is None:
+            start = time.perf_counter()
+            body = build()
+            variants = {None: body.encode('utf-8') if isinstance(body, str) else body}
+            metrics.observe_build('json' if mimetype == 'application/json' else 'html', time.perf_counter() - start)
+            render_cache.put(cache_key, variants, len(variants[None]))
+
+        body = variants.get(encoding)
+        if body is None:
+            start = time.perf_counter()
+            body = compress_body(variants[None], encoding)
+            metrics.observe_compress(time.perf_counter() - start)
+            variants = dict(variants, **{encoding: body})
+            render_cache.put(cache_key, variants, sum(len(v) for v in variants.values()))
+
+        response = app.response_class(body, mimetype=mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'  # 每次都向服务器验证ETag
+    return response
+
+
+def json_response(cache_key, build):
+    """cached_response 的JSON版本，build 返回可序列化对象"""
+    return cached_response(cache_key, lambda: json_codec.dumps(build()), mimetype='application/json')
+
+
 @app.route('/')
 def index():
     """主页面"""
-    return render_template('index.html',
-                           excel_files=excel_data,
-                           last_modified=last_modified,
-                           public_url=public_url,
-                           last_updated=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    snap = snapshot
+    return cached_response((None, None, snap.version, 'index'), lambda: render_template(
+        'index.html',
+        excel_files=snap.excel_data,
+        last_modified=snap.last_modified,
+        data_version=snap.version,
+        public_url=public_url))
+
+
+@app.route('/api/versions')
+def get_versions():
+    """轻量变化检测接口：只返回版本号，客户端据此判断是否需要刷新"""
+    snap = snapshot
+    return json_response((None, None, snap.version, 'versions'), lambda: {
+        'version': snap.version,
+        'files': dict(snap.file_versions),
+        'last_modified': dict(snap.last_modified)
+    })
+
+
+def get_sheet_rows(sheet_data, offset=0, limit=SHEET_PAGE_SIZE):
+    """取工作表的一段行数据"""
+    return sheet_data.rows(offset, limit)
+
+
+def get_wire_format():
+    """行数据格式由 format 查询参数指定，默认 records"""
+    wire_format = request.args.get('format', 'records')
+    return wire_format if wire_format in WIRE_FORMATS else 'records'
+
+
+def get_window_args():
+    """从查询参数读取 offset/limit 并限制范围"""
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', SHEET_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    return offset, limit
 
 
 @app.route('/api/data')
 def get_data():
-    """API接口返回表格数据"""
-    return jsonify({
-        'data': excel_data,
-        'last_modified': last_modified,
-        'public_url': public_url,
-        'timestamp': datetime.now().isoformat()
+    """API接口返回表格数据，带 limit 参数时每个工作表只返回一段行数据
+
+    format=columnar 时行数据为二维数组，列名只在 columns 中出现一次。
+    """
+    window = get_window_args() if 'limit' in request.args else None
+    wire_format = get_wire_format()
+    snap = snapshot
+
+    def build():
+        offset, limit = window or (0, None)
+        data = {
+            filename: {
+                sheet_name: dict(sheet_data.to_dict(offset, limit, wire_format), **({'offset': offset} if window else {}))
+                for sheet_name, sheet_data in sheets.items()
+            }
+            for filename, sheets in snap.excel_data.items()
+        }
+        return {
+            'format': wire_format,
+            'data': data,
+            'last_modified': dict(snap.last_modified),
+            'public_url': public_url
+        }
+
+    return json_response((None, None, snap.version, 'data', window, wire_format), build)
+
+
+@app.route('/api/sheet/<filename>/<sheet_name>')
+def get_sheet_window(filename, sheet_name):
+    """分页接口：返回工作表从 offset 开始的 limit 行"""
+    snap = snapshot
+    if filename not in snap.excel_data or sheet_name not in snap.excel_data[filename]:
+        return jsonify({'error': '工作表未找到'}), 404
+
+    sheet_data = snap.excel_data[filename][sheet_name]
+    offset, limit = get_window_args()
+    wire_format = get_wire_format()
+    return json_response((filename, sheet_name, snap.file_versions.get(filename), 'rows', offset, limit, wire_format),
+                         lambda: {
+                             'filename': filename,
+                             'sheet_name': sheet_name,
+                             'format': wire_format,
+                             'columns': sheet_data.columns,
+                             'row_count': sheet_data.row_count,
+                             'offset': offset,
+                             'limit': limit,
+                             'rows': sheet_data.rows_json(offset, limit, wire_format),
+                             'last_modified': snap.last_modified.get(filename)
+                         })
+
+
+@app.route('/api/sheet/<filename>/<sheet_name>/query')
+def query_sheet(filename, sheet_name):
+    """查询接口：筛选、排序、分组汇总后分页返回，参数格式见 sheet_query 模块"""
+    snap = snapshot
+    if filename not in snap.excel_data or sheet_name not in snap.excel_data[filename]:
+        return jsonify({'error': '工作表未找到'}), 404
+
+    try:
+        query = parse_query(request.args)
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+
+    sheet_data = snap.excel_data[filename][sheet_name]
+    version = snap.file_versions.get(filename)
+    offset, limit = get_window_args()
+    wire_format = get_wire_format()
+
+    try:
+        result, took_ms = get_query_result(filename, sheet_name, version, sheet_data, query)
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return json_response((filename, sheet_name, version, 'query', query, offset, limit, wire_format), lambda: {
+        'filename': filename,
+        'sheet_name': sheet_name,
+        'format': wire_format,
+        'columns': list(result.columns),
+        'row_count': len(result),
+        'offset': offset,
+        'limit': limit,
+        'rows': query_page_rows(result, offset, limit, wire_format),
+        'took_ms': took_ms
     })
 
 
+def query_page_rows(result, offset, limit, wire_format='records'):
+    page = result.iloc[offset:offset + limit]
+    record_rows(len(page))
+    return arrays_json(page) if wire_format == 'columnar' else records_json(page)
+
+
+def get_query_result(filename, sheet_name, version, sheet_data, query):
+    """执行查询或取缓存的结果，返回 (结果DataFrame, 执行耗时毫秒)；同一查询翻页时不重复计算"""
+    cache_key = (filename, sheet_name, version, query)
+    cached = query_results.get(cache_key)
+    if cached is not None:
+        return cached
+
+    start = time.perf_counter()
+    result = run_query(sheet_data.frame, query)
+    cached = (result, round((time.perf_counter() - start) * 1000, 2))
+    if result is not sheet_data.frame:  # 空查询直接返回原表，不需要缓存
+        query_results.put(cache_key, cached, int(result.memory_usage(index=True, deep=False).sum()))
+    return cached
+
+
+@app.route('/api/search')
+def search():
+    """全文搜索：q 中的每个词都按前缀匹配，返回包含全部词的行，可用 file 限定工作簿"""
+    query = request.args.get('q', '').strip()
+    only_file = request.args.get('file')
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', SEARCH_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    snap = snapshot
+
+    def build():
+        start = time.perf_counter()
+        tokens = query_tokens(query)
+        total, hits = 0, []
+        for filename, sheets in snap.excel_data.items():
+            if not tokens or (only_file and filename != only_file):
+                continue
+            index = get_search_index(snap, filename)
+            for sheet_name, rows in index.decode(index.search(tokens)):
+                # 只为当前页内的命中取行数据
+                start_row = max(offset - total, 0)
+                stop_row = max(min(offset + limit - total, len(rows)), start_row)
+                total += len(rows)
+                if start_row >= stop_row:
+                    continue
+                page_rows = rows[start_row:stop_row]
+                frame = sheets[sheet_name].frame.iloc[page_rows]
+                record_rows(len(frame))
+                for row, values in zip(page_rows.tolist(), record_fragments(frame)):
+                    hits.append({'file': filename, 'sheet': sheet_name, 'row': row, 'values': RawJSON(values)})
+        return {
+            'query': query,
+            'tokens': tokens,
+            'total': total,
+            'offset': offset,
+            'limit': limit,
+            'hits': hits,
+            'took_ms': round((time.perf_counter() - start) * 1000, 2)
+        }
+
+    return json_response((None, None, snap.version, 'search', query, only_file, offset, limit), build)
+
+
 @app.route('/view/<filename>')
 def view_file(filename):
-    """查看特定Excel文件的所有工作表"""
-    if filename in excel_data:
-        return render_template('table_view.html',
-                               filename=filename,
-                               sheets=excel_data[filename],
-                               last_modified=last_modified.get(filename, '未知'),
-                               public_url=public_url,
-                               last_updated=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    """查看特定Excel文件的所有工作表（每个工作表先渲染首屏，其余滚动加载）"""
+    snap = snapshot
+    if filename in snap.excel_data:
+        sheets = snap.excel_data[filename]
+        return cached_response((filename, None, snap.file_versions.get(filename), 'view'), lambda: render_template(
+            'table_view.html',
+            filename=filename,
+            sheets=sheets,
+            first_rows={name: get_sheet_rows(data) for name, data in sheets.items()},
+            sheets_columns={name: data.columns for name, data in sheets.items()},
+            page_size=SHEET_PAGE_SIZE,
+            file_version=snap.file_versions.get(filename, 0),
+            last_modified=snap.last_modified.get(filename, '未知'),
+            public_url=public_url))
     else:
         return render_template('error.html', message=f"文件 '{filename}' 未找到"), 404
 
 
 @app.route('/sheet/<filename>/<sheet_name>')
 def view_sheet(filename, sheet_name):
-    """查看特定工作表"""
-    if filename in excel_data and sheet_name in excel_data[filename]:
-        sheet_data = excel_data[filename][sheet_name]
-        return render_template('sheet_view.html',
-                               filename=filename,
-                               sheet_name=sheet_name,
-                               sheet_data=sheet_data,
-                               public_url=public_url,
-                               last_modified=last_modified.get(filename, '未知'))
+    """查看特定工作表（先渲染首屏，其余行滚动时分页加载）"""
+    snap = snapshot
+    if filename in snap.excel_data and sheet_name in snap.excel_data[filename]:
+        sheet_data = snap.excel_data[filename][sheet_name]
+        return cached_response((filename, sheet_name, snap.file_versions.get(filename), 'sheet'), lambda: render_template(
+            'sheet_view.html',
+            filename=filename,
+            sheet_name=sheet_name,
+            sheet_data=sheet_data,
+            rows=get_sheet_rows(sheet_data),
+            page_size=SHEET_PAGE_SIZE,
+            public_url=public_url,
+            last_modified=snap.last_modified.get(filename, '未知')))
     else:
         return render_template('error.html', message=f"工作表未找到"), 404
 
 
+def search_index_stats():
+    indexes = [index for _, index in list(search_indexes.values())]
+    return {
+        'files': len(indexes),
+        'cells': sum(index.cell_count for index in indexes),
+        'tokens': sum(len(index.vocabulary) for index in indexes),
+        'bytes': sum(index.nbytes() for index in indexes)
+    }
+
+
 @app.route('/status')
 def status():
     """服务状态页面"""
     return jsonify({
         'status': 'running',
-        'files_count': len(excel_data),
+        'files_count': len(snapshot.excel_data),
         'public_url': public_url,
         'local_ip': get_local_ip(),
+        'reload': reload_worker.stats() if reload_worker else None,
+        'render_cache': render_cache.stats(),
+        'lazy_mode': lazy_mode,
+        'pid': os.getpid(),
+        'role': 'follower' if state_follower else 'primary',
+        'loaded_sheets': loaded_sheets.stats() if lazy_mode else None,
+        'query_results': query_results.stats(),
+        'metrics': metrics.summary(),
+        'search_index': search_index_stats(),
         'last_updated': datetime.now().isoformat()
     })
 
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus 文本格式的运行指标（每个进程单独统计）"""
+    caches = {'render': render_cache.stats(), 'query': query_results.stats()}
+    if lazy_mode:
+        caches['lazy_sheets'] = loaded_sheets.stats()
+    index_stats = search_index_stats()
+    body = metrics.prometheus(caches, [
+        ('excel_viewer_data_version', '当前数据版本号', snapshot.version),
+        ('excel_viewer_files', '已加载的工作簿数量', len(snapshot.excel_data)),
+        ('excel_viewer_search_index_bytes', '搜索索引占用字节数', index_stats['bytes']),
+        ('excel_viewer_reload_pending', '等待重新加载的文件数',
+         reload_worker.stats()['pending'] if reload_worker else 0),
+    ])
+    return app.response_class(body, mimetype='text/plain; version=0.0.4')
+
+
 def create_templates():
     """创建HTML模板文件"""
     template_dir = "templates"
@@ -403,6 +1383,23 @@ def create_templates():
             background: rgba(255,255,255,0.5);
             color: white;
         }
+        .search-hit {
+            padding: 0.6rem 0.8rem;
+            margin: 0.4rem 0;
+            background: #fff;
+            border-radius: 8px;
+            border-left: 3px solid #fd7e14;
+            cursor: pointer;
+            font-size: 0.9em;
+            word-break: break-all;
+        }
+        .search-hit:hover {
+            background: #f8f9fa;
+        }
+        .search-hit mark {
+            padding: 0;
+            background: #ffe08a;
+        }
     </style>
 </head>
 <body>
@@ -439,6 +1436,11 @@ def create_templates():
                     </div>
                     <div class="card-body">
                         {% if excel_files %}
+                        <div class="input-group mb-2">
+                            <span class="input-group-text"><i class="fas fa-search"></i></span>
+                            <input type="search" class="form-control" id="search-input" placeholder="搜索所有表格，如零件编号、名称..." autocomplete="off">
+                        </div>
+                        <div id="search-results" class="mb-3"></div>
                         <div class="file-list">
                             {% for filename, sheets in excel_files.items() %}
                             <div class="file-item">
@@ -487,7 +1489,7 @@ def create_templates():
                         {% endif %}
 
                         <div class="mt-4 text-center update-time">
-                            <i class="fas fa-sync-alt"></i> 最后检查: {{ last_updated }}
+                            <i class="fas fa-sync-alt"></i> 最后检查: <span id="last-checked"></span>
                         </div>
                     </div>
                 </div>
@@ -527,14 +1529,86 @@ def create_templates():
             });
         }
 
+        const dataVersion = {{ data_version }};
+
+        // 页面可能来自服务端缓存，检查时间由浏览器填写
+        function showLastChecked() {
+            document.getElementById('last-checked').textContent = new Date().toLocaleString('zh-CN', {hour12: false});
+        }
+        showLastChecked();
+
+        // 全文搜索：输入停顿后查询服务端索引，结果可继续加载下一页
+        const SEARCH_PAGE_SIZE = 20;
+        let searchTimer = null;
+        let searchQuery = '';
+        let searchOffset = 0;
+
+        function escapeHtml(value) {
+            return String(value).replace(/[&<>"']/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c]));
+        }
+
+        function highlight(text, tokens) {
+            let html = escapeHtml(text);
+            tokens.forEach(token => {
+                const pattern = escapeHtml(token).replace(/[.*+?^${}()|[\\]\\\\]/g, '\\\\$&');
+                html = html.replace(new RegExp(pattern, 'gi'), match => '<mark>' + match + '</mark>');
+            });
+            return html;
+        }
+
+        function runSearch(append) {
+            const results = document.getElementById('search-results');
+            if (!searchQuery) {
+                results.innerHTML = '';
+                return;
+            }
+            const params = new URLSearchParams({q: searchQuery, offset: searchOffset, limit: SEARCH_PAGE_SIZE});
+            fetch('/api/search?' + params)
+                .then(response => response.json())
+                .then(data => {
+                    if (data.query !== searchQuery) return;  // 已有更新的查询
+                    let html = '';
+                    data.hits.forEach(hit => {
+                        const cells = Object.values(hit.values).filter(v => v !== '').map(v => highlight(v, data.tokens));
+                        html += '<div class="search-hit" onclick="viewSheet(' + escapeHtml(JSON.stringify(hit.file)) + ', ' + escapeHtml(JSON.stringify(hit.sheet)) + ')">'
+                            + '<div class="stats"><i class="fas fa-file-excel text-success"></i> ' + escapeHtml(hit.file)
+                            + ' / ' + escapeHtml(hit.sheet) + ' · 第 ' + (hit.row + 1) + ' 行</div>'
+                            + cells.join(' | ') + '</div>';
+                    });
+                    const more = data.offset + data.hits.length < data.total;
+                    const summary = '<div class="stats search-summary">共 ' + data.total + ' 条结果（' + data.took_ms + ' 毫秒）'
+                        + (more ? ' <a href="#" onclick="searchMore(); return false;">加载更多</a>' : '') + '</div>';
+                    const previous = append ? results.querySelectorAll('.search-hit') : [];
+                    results.innerHTML = summary + Array.from(previous).map(el => el.outerHTML).join('') + html;
+                })
+                .catch(error => console.error('搜索失败:', error));
+        }
+
+        function searchMore() {
+            searchOffset += SEARCH_PAGE_SIZE;
+            runSearch(true);
+        }
+
+        const searchInput = document.getElementById('search-input');
+        if (searchInput) {
+            searchInput.addEventListener('input', () => {
+                clearTimeout(searchTimer);
+                searchTimer = setTimeout(() => {
+                    searchQuery = searchInput.value.trim();
+                    searchOffset = 0;
+                    runSearch(false);
+                }, 250);
+            });
+        }
+
         function refreshData() {
             const icon = document.getElementById('refresh-icon');
             icon.style.animation = 'spin 1s linear infinite';
 
-            fetch('/api/data')
+            fetch('/api/versions')
                 .then(response => response.json())
                 .then(data => {
-                    console.log('数据已更新', data.timestamp);
+                    console.log('数据已更新', data.version);
                     setTimeout(() => {
                         location.reload();
                     }, 1000);
@@ -545,8 +1619,21 @@ def create_templates():
                 });
         }
 
-        // 自动刷新功能
-        setInterval(refreshData, 30000); // 30秒自动刷新一次
+        // 自动检查更新：只比较版本号，有变化时才刷新页面
+        function checkForUpdates() {
+            fetch('/api/versions')
+                .then(response => response.json())
+                .then(data => {
+                    showLastChecked();
+                    if (data.version !== dataVersion) {
+                        console.log('检测到数据更新，正在刷新页面...');
+                        location.reload();
+                    }
+                })
+                .catch(error => console.error('检查更新失败:', error));
+        }
+
+        setInterval(checkForUpdates, 30000); // 30秒检查一次
     </script>
 
     <style>
@@ -667,6 +1754,12 @@ def create_templates():
             font-size: 0.9em;
             display: inline-block;
         }
+        .load-status {
+            text-align: center;
+            color: #6c757d;
+            padding: 0.75rem;
+            font-size: 0.9em;
+        }
     </style>
 </head>
 <body>
@@ -723,8 +1816,9 @@ def create_templates():
                     </div>
                 </div>
 
-                <div class="table-container">
-                    {% if sheet_data.data %}
+                <div class="table-container" data-sheet="{{ sheet_name }}" data-row-count="{{ sheet_data.row_count }}"
+                     data-loaded="{{ first_rows[sheet_name]|length }}">
+                    {% if first_rows[sheet_name] %}
                     <table class="table table-striped table-hover">
                         <thead>
                             <tr>
@@ -735,7 +1829,7 @@ def create_templates():
                             </tr>
                         </thead>
                         <tbody>
-                            {% for row in sheet_data.data %}
+                            {% for row in first_rows[sheet_name] %}
                             <tr>
                                 <td>{{ loop.index }}</td>
                                 {% for col in sheet_data.columns %}
@@ -745,6 +1839,9 @@ def create_templates():
                             {% endfor %}
                         </tbody>
                     </table>
+                    {% if first_rows[sheet_name]|length < sheet_data.row_count %}
+                    <div class="load-status">向下滚动加载更多...</div>
+                    {% endif %}
                     {% else %}
                     <div class="text-center py-5">
                         <i class="fas fa-exclamation-triangle fa-3x text-muted"></i>
@@ -764,6 +1861,55 @@ def create_templates():
     <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js"></script>
     <script>
         let currentSheet = 0;
+        const filename = {{ filename|tojson }};
+        const sheetColumns = {{ sheets_columns|tojson }};
+        const pageSize = {{ page_size }};
+
+        // 工作表滚动到底部附近时分页加载剩余行
+        function loadMoreRows(container) {
+            const total = parseInt(container.dataset.rowCount, 10);
+            const loaded = parseInt(container.dataset.loaded, 10);
+            if (container.dataset.loading === '1' || loaded >= total) return;
+            container.dataset.loading = '1';
+
+            const sheetName = container.dataset.sheet;
+            const status = container.querySelector('.load-status');
+            const url = '/api/sheet/' + encodeURIComponent(filename) + '/' + encodeURIComponent(sheetName)
+                + `?offset=${loaded}&limit=${pageSize}&format=columnar`;
+            fetch(url)
+                .then(response => response.json())
+                .then(data => {
+                    const fragment = document.createDocumentFragment();
+                    data.rows.forEach((row, i) => {
+                        const tr = document.createElement('tr');
+                        const indexCell = document.createElement('td');
+                        indexCell.textContent = data.offset + i + 1;
+                        tr.appendChild(indexCell);
+                        // columnar 格式：row 为按列顺序排列的值数组
+                        sheetColumns[sheetName].forEach((col, c) => {
+                            const td = document.createElement('td');
+                            td.textContent = row[c] ?? '';
+                            tr.appendChild(td);
+                        });
+                        fragment.appendChild(tr);
+                    });
+                    container.querySelector('tbody').appendChild(fragment);
+
+                    const newLoaded = data.rows.length ? data.offset + data.rows.length : total;
+                    container.dataset.loaded = newLoaded;
+                    if (status && newLoaded >= total) status.remove();
+                })
+                .catch(error => console.error('加载数据失败:', error))
+                .finally(() => { container.dataset.loading = ''; });
+        }
+
+        document.querySelectorAll('.table-container[data-sheet]').forEach(container => {
+            container.addEventListener('scroll', () => {
+                if (container.scrollTop + container.clientHeight >= container.scrollHeight - 300) {
+                    loadMoreRows(container);
+                }
+            });
+        });
 
         function showSheet(sheetName) {
             // 隐藏所有工作表
@@ -796,12 +1942,11 @@ def create_templates():
         // 自动刷新
         setInterval(() => {
             console.log('自动检查更新...');
-            fetch('/api/data')
+            fetch('/api/versions')
                 .then(response => response.json())
                 .then(data => {
-                    // 检查文件是否有更新
-                    const currentFile = '{{ filename }}';
-                    if (data.last_modified[currentFile] !== '{{ last_modified }}') {
+                    // 检查文件版本号是否变化
+                    if (data.files[filename] !== {{ file_version }}) {
                         console.log('检测到文件更新，正在刷新页面...');
                         location.reload();
                     }
@@ -898,6 +2043,12 @@ def create_templates():
             display: inline-block;
             margin-left: 1rem;
         }
+        .load-status {
+            text-align: center;
+            color: #6c757d;
+            padding: 0.75rem;
+            font-size: 0.9em;
+        }
     </style>
 </head>
 <body>
@@ -928,8 +2079,8 @@ def create_templates():
                 </div>
             </div>
 
-            <div class="table-container">
-                {% if sheet_data.data %}
+            <div class="table-container" id="table-container">
+                {% if rows %}
                 <table class="table table-striped table-hover">
                     <thead>
                         <tr>
@@ -939,8 +2090,8 @@ def create_templates():
                             {% endfor %}
                         </tr>
                     </thead>
-                    <tbody>
-                        {% for row in sheet_data.data %}
+                    <tbody id="sheet-rows">
+                        {% for row in rows %}
                         <tr>
                             <td><strong>{{ loop.index }}</strong></td>
                             {% for col in sheet_data.columns %}
@@ -950,6 +2101,9 @@ def create_templates():
                         {% endfor %}
                     </tbody>
                 </table>
+                <div class="load-status" id="load-status">
+                    {% if rows|length < sheet_data.row_count %}向下滚动加载更多...{% endif %}
+                </div>
                 {% else %}
                 <div class="text-center py-5">
                     <i class="fas fa-exclamation-triangle fa-3x text-muted"></i>
@@ -962,18 +2116,77 @@ def create_templates():
     </div>
 
     <script>
+        const sheetApi = '/api/sheet/' + encodeURIComponent({{ filename|tojson }}) + '/' + encodeURIComponent({{ sheet_name|tojson }});
+        const columns = {{ sheet_data.columns|tojson }};
+        const totalRows = {{ sheet_data.row_count }};
+        const pageSize = {{ page_size }};
+        let loadedRows = {{ rows|length }};
+        let loading = false;
+
         function goBack() {
             window.location.href = '/';
         }
 
-        // 双击单元格查看完整内容
-        document.querySelectorAll('.table td').forEach(cell => {
-            cell.addEventListener('dblclick', function() {
-                const fullText = this.getAttribute('title') || this.textContent;
-                if (fullText.trim()) {
-                    alert(fullText);
-                }
+        // 追加一页数据行
+        function appendRows(rows, offset) {
+            const fragment = document.createDocumentFragment();
+            rows.forEach((row, i) => {
+                const tr = document.createElement('tr');
+                const indexCell = document.createElement('td');
+                const strong = document.createElement('strong');
+                strong.textContent = offset + i + 1;
+                indexCell.appendChild(strong);
+                tr.appendChild(indexCell);
+                // columnar 格式：row 为按列顺序排列的值数组
+                columns.forEach((col, c) => {
+                    const td = document.createElement('td');
+                    const value = row[c] ?? '';
+                    td.textContent = value;
+                    td.title = value;
+                    tr.appendChild(td);
+                });
+                fragment.appendChild(tr);
             });
+            document.getElementById('sheet-rows').appendChild(fragment);
+        }
+
+        // 滚动到底部附近时加载下一页
+        function loadMoreRows() {
+            if (loading || loadedRows >= totalRows) return;
+            loading = true;
+            const status = document.getElementById('load-status');
+            status.textContent = '加载中...';
+
+            fetch(`${sheetApi}?offset=${loadedRows}&limit=${pageSize}&format=columnar`)
+                .then(response => response.json())
+                .then(data => {
+                    appendRows(data.rows, data.offset);
+                    loadedRows = data.offset + data.rows.length;
+                    status.textContent = loadedRows < totalRows ? '向下滚动加载更多...' : '';
+                    if (data.rows.length === 0) loadedRows = totalRows;
+                })
+                .catch(error => {
+                    console.error('加载数据失败:', error);
+                    status.textContent = '加载失败，继续滚动重试';
+                })
+                .finally(() => { loading = false; });
+        }
+
+        const container = document.getElementById('table-container');
+        container.addEventListener('scroll', () => {
+            if (container.scrollTop + container.clientHeight >= container.scrollHeight - 300) {
+                loadMoreRows();
+            }
+        });
+
+        // 双击单元格查看完整内容
+        container.addEventListener('dblclick', event => {
+            const cell = event.target.closest('td');
+            if (!cell) return;
+            const fullText = cell.getAttribute('title') || cell.textContent;
+            if (fullText.trim()) {
+                alert(fullText);
+            }
         });
     </script>
 </body>
@@ -1044,9 +2257,14 @@ def create_templates():
         f.write(error_html)
 
 
-def start_file_monitor(folder_path="excel_files"):
+def start_file_monitor(folder_path="excel_files", debounce=1.0):
     """启动文件监控"""
-    event_handler = ExcelFileHandler(folder_path)
+    global reload_worker
+
+    reload_worker = ReloadWorker(debounce=debounce)
+    reload_worker.start()
+
+    event_handler = ExcelFileHandler(folder_path, reload_worker)
     observer = Observer()
     observer.schedule(event_handler, folder_path, recursive=False)
     observer.start()
@@ -1054,9 +2272,83 @@ def start_file_monitor(folder_path="excel_files"):
     return observer
 
 
+def serve_gunicorn(host, port, workers, threads):
+    """gunicorn 多进程部署：数据在主进程加载后随fork共享，文件监控只在主进程运行"""
+    from gunicorn.app.base import BaseApplication
+
+    class ViewerApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f"{host}:{port}")
+            self.cfg.set('workers', workers)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('threads', threads)
+            self.cfg.set('post_fork', lambda server, worker: become_follower())
+
+        def load(self):
+            return app
+
+    ViewerApplication().run()
+
+
+def serve_uvicorn(host, port, workers):
+    """uvicorn 多进程部署：工作进程通过环境变量找到共享状态文件并从磁盘缓存载入数据"""
+    import uvicorn
+
+    os.environ['EXCEL_VIEWER_SHARED_STATE'] = os.path.abspath(shared_state_path)
+    uvicorn.run("main:app", host=host, port=port, workers=workers, interface='wsgi')
+
+
+def serve_waitress(host, port, threads):
+    """waitress 单进程多线程部署"""
+    from waitress import serve
+
+    serve(app, host=host, port=port, threads=threads)
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="Excel二维码查看器")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="启动时并行解析Excel的进程数（默认CPU核数，1为串行）")
+    parser.add_argument('--cache-dir', default=".excel_cache",
+                        help="解析结果磁盘缓存目录（默认 .excel_cache）")
+    parser.add_argument('--no-cache', action='store_true', help="不使用磁盘缓存")
+    parser.add_argument('--stream-threshold-mb', type=float, default=STREAMING_THRESHOLD_BYTES / 1024 / 1024,
+                        help="超过此大小(MB)的.xlsx改用openpyxl只读流式读取")
+    parser.add_argument('--lazy', action='store_true',
+                        help="按需加载：启动时只读取工作表尺寸，首次查看时才解析单元格")
+    parser.add_argument('--lazy-cache-mb', type=int, default=LAZY_CACHE_MB,
+                        help=f"按需加载模式下已解析工作表的内存上限，单位MB（默认 {LAZY_CACHE_MB}）")
+    parser.add_argument('--render-cache-mb', type=int, default=RENDER_CACHE_MB,
+                        help=f"页面渲染缓存内存上限，单位MB（默认 {RENDER_CACHE_MB}）")
+    parser.add_argument('--query-cache-mb', type=int, default=QUERY_CACHE_MB,
+                        help=f"查询结果缓存内存上限，单位MB（默认 {QUERY_CACHE_MB}）")
+    parser.add_argument('--serve', choices=['flask', 'waitress', 'gunicorn', 'uvicorn'], default='flask',
+                        help="服务器：flask 开发服务器（默认）、waitress 多线程、gunicorn/uvicorn 多进程")
+    parser.add_argument('--serve-workers', type=int, default=os.cpu_count() or 1,
+                        help="gunicorn/uvicorn 工作进程数（默认CPU核数）")
+    parser.add_argument('--threads', type=int, default=8, help="每个工作进程的线程数（默认 8）")
+    parser.add_argument('--port', type=int, default=8000, help="监听端口（默认 8000）")
+    return parser.parse_args(argv)
+
+
 def main():
     """主函数"""
-    global public_url
+    global public_url, cache_dir, streaming_threshold, lazy_mode, shared_state_path
+
+    args = parse_args()
+    cache_dir = None if args.no_cache else args.cache_dir
+    if args.serve in ('gunicorn', 'uvicorn'):
+        if cache_dir is None:
+            print("⚠️ 多进程模式通过磁盘缓存共享解析结果，已忽略 --no-cache")
+            cache_dir = args.cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        shared_state_path = os.path.join(cache_dir, SHARED_STATE_FILE)
+    streaming_threshold = int(args.stream_threshold_mb * 1024 * 1024)
+    render_cache.max_bytes = args.render_cache_mb * 1024 * 1024
+    query_results.max_bytes = args.query_cache_mb * 1024 * 1024
+    lazy_mode = args.lazy
+    loaded_sheets.max_bytes = args.lazy_cache_mb * 1024 * 1024
 
     print("=== Excel二维码查看器 v3.0 - 全球公网版 ===")
     print("正在启动服务...")
@@ -1072,14 +2364,14 @@ def main():
     create_templates()
 
     # 加载Excel文件
-    load_excel_files()
+    load_excel_files(workers=args.workers)
 
     # 启动文件监控
     observer = start_file_monitor()
 
     # 获取本机IP和端口
     local_host = get_local_ip()
-    port = 8000
+    port = args.port
     local_url = f"http://{local_host}:{port}"
 
     # 启动ngrok（如果可用）
@@ -1118,15 +2410,28 @@ def main():
     print(f"📁 Excel文件夹: excel_files/")
     print(f"📄 二维码文件: qr_code.png, qr_code_print.png")
     print(f"⚡ 文件监控: 已启用实时更新")
+    if args.serve != 'flask':
+        print(f"🏭 生产服务器: {args.serve}")
     print("\n按 Ctrl+C 停止服务")
     print("=" * 60)
 
+    # 公网地址确定后再写一次共享状态，工作进程页面中才能显示
+    write_shared_state()
+
     try:
-        # 启动Flask应用
-        app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
+        if args.serve == 'gunicorn':
+            serve_gunicorn('0.0.0.0', port, args.serve_workers, args.threads)
+        elif args.serve == 'uvicorn':
+            serve_uvicorn('0.0.0.0', port, args.serve_workers)
+        elif args.serve == 'waitress':
+            serve_waitress('0.0.0.0', port, args.threads)
+        else:
+            # 启动Flask开发服务器
+            app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
     except KeyboardInterrupt:
         print("\n正在停止服务...")
         observer.stop()
+        reload_worker.stop()
         if ngrok_process:
             try:
                 ngrok_process.terminate()
@@ -0,0 +1,200 @@
+"""运行指标：请求耗时直方图、响应字节数、渲染行数、工作簿重新加载耗时、锁等待时间
+
+所有计数在进程内累计（多进程部署时每个工作进程各自统计），可导出为
+Prometheus 文本格式或 /status 使用的JSON摘要。
+"""
+import bisect
+import threading
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RELOAD_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class Histogram:
+    """固定分桶的直方图，counts[i] 为落在第i个桶（不累计）的次数，最后一个桶为 +Inf"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """按桶上界估算分位数，落在 +Inf 桶时返回最大的有限上界"""
+        if not self.count:
+            return None
+        target, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.buckets[-1]
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.sum / self.count * 1000, 2) if self.count else None,
+            'p50_ms': _ms(self.quantile(0.5)),
+            'p99_ms': _ms(self.quantile(0.99))
+        }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+class Metrics:
+    """线程安全的指标集合"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}        # (路由, 方法, 状态码) -> Histogram
+        self.response_bytes = {}  # 路由 -> 字节数
+        self.rows_rendered = {}   # 路由 -> 行数
+        self.build_seconds = {}   # 响应类型(html/json) -> Histogram，只统计缓存未命中时的模板渲染/JSON编码
+        self.compress_seconds = Histogram(LATENCY_BUCKETS)
+        self.reloads = {}         # 文件名 -> Histogram
+        self.reload_last = {}     # 文件名 -> 最近一次耗时
+        self.lock_waits = {}      # 锁名 -> Histogram，每次阻塞获取锁的等待时间
+
+    def observe_request(self, route, method, status, seconds, size, rows):
+        with self._lock:
+            key = (route, method, status)
+            histogram = self.requests.get(key)
+            if histogram is None:
+                histogram = self.requests[key] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+            self.response_bytes[route] = self.response_bytes.get(route, 0) + size
+            if rows:
+                self.rows_rendered[route] = self.rows_rendered.get(route, 0) + rows
+
+    def observe_build(self, kind, seconds):
+        with self._lock:
+            histogram = self.build_seconds.get(kind)
+            if histogram is None:
+                histogram = self.build_seconds[kind] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+
+    def observe_compress(self, seconds):
+        with self._lock:
+            self.compress_seconds.observe(seconds)
+
+    def observe_reload(self, filename, seconds):
+        with self._lock:
+            histogram = self.reloads.get(filename)
+            if histogram is None:
+                histogram = self.reloads[filename] = Histogram(RELOAD_BUCKETS)
+            histogram.observe(seconds)
+            self.reload_last[filename] = seconds
+
+    def observe_lock_wait(self, name, seconds):
+        with self._lock:
+            histogram = self.lock_waits.get(name)
+            if histogram is None:
+                histogram = self.lock_waits[name] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+
+    def summary(self):
+        """/status 使用的JSON摘要"""
+        with self._lock:
+            routes = {}
+            for (route, method, status), histogram in self.requests.items():
+                entry = routes.setdefault(route, {'count': 0, 'status': {}, 'latency': Histogram(LATENCY_BUCKETS)})
+                entry['count'] += histogram.count
+                entry['status'][status] = entry['status'].get(status, 0) + histogram.count
+                merged = entry['latency']
+                merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+                merged.sum += histogram.sum
+                merged.count += histogram.count
+            return {
+                'routes': {
+                    route: dict(entry['latency'].summary(), status=entry['status'],
+                                response_bytes=self.response_bytes.get(route, 0),
+                                rows_rendered=self.rows_rendered.get(route, 0))
+                    for route, entry in sorted(routes.items())
+                },
+                'build': {kind: histogram.summary() for kind, histogram in self.build_seconds.items()},
+                'compress': self.compress_seconds.summary(),
+                'reloads': {
+                    filename: dict(histogram.summary(), last_ms=_ms(self.reload_last[filename]))
+                    for filename, histogram in sorted(self.reloads.items())
+                },
+                'locks': {
+                    name: dict(histogram.summary(), total_wait_ms=_ms(histogram.sum))
+                    for name, histogram in sorted(self.lock_waits.items())
+                }
+            }
+
+    def prometheus(self, caches, extra_gauges=()):
+        """导出为 Prometheus 文本格式；caches 为 {缓存名: LRUCache.stats()}"""
+        lines = []
+        with self._lock:
+            _histogram_lines(lines, 'excel_viewer_request_duration_seconds', '请求处理耗时',
+                             [({'route': route, 'method': method, 'status': str(status)}, histogram)
+                              for (route, method, status), histogram in sorted(self.requests.items())])
+            _counter_lines(lines, 'excel_viewer_response_bytes_total', '响应体字节数（压缩后）',
+                           [({'route': route}, value) for route, value in sorted(self.response_bytes.items())])
+            _counter_lines(lines, 'excel_viewer_rows_rendered_total', '渲染或序列化的表格行数',
+                           [({'route': route}, value) for route, value in sorted(self.rows_rendered.items())])
+            _histogram_lines(lines, 'excel_viewer_build_duration_seconds', '缓存未命中时模板渲染/JSON编码耗时',
+                             [({'kind': kind}, histogram) for kind, histogram in sorted(self.build_seconds.items())])
+            _histogram_lines(lines, 'excel_viewer_compress_duration_seconds', '响应体压缩耗时',
+                             [({}, self.compress_seconds)])
+            _histogram_lines(lines, 'excel_viewer_reload_duration_seconds', '工作簿解析并发布的耗时',
+                             [({'file': filename}, histogram) for filename, histogram in sorted(self.reloads.items())])
+            _histogram_lines(lines, 'excel_viewer_lock_wait_seconds', '获取锁的等待时间（与加载线程的争用）',
+                             [({'lock': name}, histogram) for name, histogram in sorted(self.lock_waits.items())])
+
+        for suffix, help_text, kind, field in (
+                ('hits_total', '缓存命中次数', 'counter', 'hits'),
+                ('misses_total', '缓存未命中次数', 'counter', 'misses'),
+                ('bytes', '缓存占用字节数', 'gauge', 'bytes'),
+                ('entries', '缓存条目数', 'gauge', 'entries')):
+            name = f"excel_viewer_cache_{suffix}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for cache_name, stats in caches.items():
+                lines.append(f"{name}{_labels({'cache': cache_name})} {stats[field]}")
+
+        for name, help_text, value in extra_gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _counter_lines(lines, name, help_text, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(labels)} {value}")
+
+
+def _histogram_lines(lines, name, help_text, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, histogram in samples:
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f"{name}_bucket{_labels(dict(labels, le=le))} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+        lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
@@ -0,0 +1,155 @@
+"""全文搜索倒排索引
+
+每个工作簿一份索引：词 -> 出现该词的 (工作表, 行) 列表。词表排序存放，前缀查询只需
+二分查找出一段连续区间；倒排列表按CSR方式存成一个大的int64数组，每个条目编码为
+工作表序号 << 32 | 行号，多个词的结果用有序数组求交集。
+
+分词规则：字母数字连续串为一个词；中日韩文字没有空格分隔，按相邻两字切分，
+并额外收录每段的最后一个字，这样单字查询也能通过前缀匹配命中任意位置。
+"""
+import re
+import bisect
+
+import numpy as np
+import pandas as pd
+
+WORD_RE = re.compile(r'[^\W_]+')
+CJK_RE = re.compile(r'([぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]+)')
+PREFIX_END = '\U0010ffff'
+ROW_BITS = 32
+
+
+def format_cell(value):
+    """单元格值转为文本，整数值的浮点数去掉 .0"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def tokenize(text, query=False):
+    """把文本切分为索引词（小写）
+
+    query=True 时长度大于1的中日韩片段不再附加末字：末字已包含在最后一个双字词里。
+    """
+    tokens = []
+    for word in WORD_RE.findall(text.lower()):
+        for i, part in enumerate(CJK_RE.split(word)):
+            if not part:
+                continue
+            if i % 2 == 0:  # 非中日韩部分
+                tokens.append(part)
+            else:
+                tokens.extend(part[j:j + 2] for j in range(len(part) - 1))
+                if not query or len(part) == 1:
+                    tokens.append(part[-1])
+    return tokens
+
+
+def query_tokens(query):
+    """查询词去重，保持顺序"""
+    return list(dict.fromkeys(tokenize(query, query=True)))
+
+
+class WorkbookIndex:
+    """单个工作簿的倒排索引，构建后只读"""
+
+    __slots__ = ('sheet_names', 'vocabulary', 'offsets', 'postings', 'cell_count')
+
+    def __init__(self, frames):
+        """frames: {工作表名: DataFrame}，空值不建索引"""
+        self.sheet_names = list(frames)
+        self.cell_count = 0
+        token_rows = {}
+
+        for sheet_index, frame in enumerate(frames.values()):
+            base = np.int64(sheet_index) << ROW_BITS
+            for col in range(frame.shape[1]):
+                # 相同的值只分词一次：先把列分解为 去重值 + 每行的编号
+                codes, uniques = pd.factorize(frame.iloc[:, col], use_na_sentinel=True)
+                if not len(uniques):
+                    continue
+                order = np.argsort(codes, kind='stable')
+                bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+                rows = order.astype(np.int64) + base
+                self.cell_count += len(codes) - int(bounds[0])
+
+                for code, value in enumerate(uniques):
+                    text = format_cell(value)
+                    if not text:
+                        continue
+                    value_rows = rows[bounds[code]:bounds[code + 1]]
+                    for token in set(tokenize(text)):
+                        token_rows.setdefault(token, []).append(value_rows)
+
+        self.vocabulary = sorted(token_rows)
+        lists = []
+        for token in self.vocabulary:
+            parts = token_rows[token]
+            # 同一个词可能来自多列或多个值，合并后去重排序
+            lists.append(parts[0] if len(parts) == 1 else np.unique(np.concatenate(parts)))
+        self.offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum([len(postings) for postings in lists], out=self.offsets[1:])
+        self.postings = np.concatenate(lists) if lists else np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def merge(cls, indexes):
+        """按顺序合并多个索引的工作表，结果与一次性用所有工作表建立的索引相同
+
+        逐个工作表建索引再合并，不需要同时持有整个工作簿的DataFrame。
+        """
+        merged = cls.__new__(cls)
+        merged.sheet_names = [name for index in indexes for name in index.sheet_names]
+        merged.cell_count = sum(index.cell_count for index in indexes)
+        bases = np.cumsum([0] + [len(index.sheet_names) for index in indexes]).astype(np.int64) << ROW_BITS
+
+        # 各索引的 (词, 倒排列表区间) 连在一起，按词稳定排序：同一个词按索引顺序排列，
+        # 工作表序号在高位，拼接后的倒排列表仍然有序
+        tokens = [token for index in indexes for token in index.vocabulary]
+        shifts = np.cumsum([0] + [len(index.postings) for index in indexes])
+        starts = np.concatenate([index.offsets[:-1] + shift for index, shift in zip(indexes, shifts)]
+                                + [np.empty(0, dtype=np.int64)])
+        lengths = np.concatenate([np.diff(index.offsets) for index in indexes] + [np.empty(0, dtype=np.int64)])
+        postings = np.concatenate([index.postings + base for index, base in zip(indexes, bases)]
+                                  + [np.empty(0, dtype=np.int64)])
+
+        order = sorted(range(len(tokens)), key=tokens.__getitem__)
+        tokens = [tokens[i] for i in order]
+        order = np.array(order, dtype=np.int64)
+        lengths = lengths[order]
+        ends = np.cumsum(lengths)
+        gather = np.repeat(starts[order] - (ends - lengths), lengths) + np.arange(int(ends[-1]) if len(ends) else 0)
+        merged.postings = postings[gather]
+
+        first = [k for k in range(len(tokens)) if k == 0 or tokens[k] != tokens[k - 1]]
+        merged.vocabulary = [tokens[k] for k in first]
+        merged.offsets = np.append((ends - lengths)[first], ends[-1] if len(ends) else 0).astype(np.int64)
+        return merged
+
+    def lookup(self, token):
+        """返回以 token 为前缀的所有词的行，有序且不重复"""
+        lo = bisect.bisect_left(self.vocabulary, token)
+        hi = bisect.bisect_left(self.vocabulary, token + PREFIX_END, lo)
+        if lo == hi:
+            return self.postings[:0]
+        postings = self.postings[self.offsets[lo]:self.offsets[hi]]
+        return postings if hi - lo == 1 else np.unique(postings)
+
+    def search(self, tokens):
+        """所有查询词（前缀匹配）都出现的行，返回编码后的有序数组"""
+        result = None
+        for postings in sorted((self.lookup(token) for token in tokens), key=len):
+            result = postings if result is None else np.intersect1d(result, postings, assume_unique=True)
+            if not len(result):
+                break
+        return self.postings[:0] if result is None else result
+
+    def decode(self, hits):
+        """把编码后的命中拆分为 [(工作表名, 行号数组)]，按工作表顺序"""
+        sheets = hits >> ROW_BITS
+        rows = hits & ((1 << ROW_BITS) - 1)
+        bounds = np.searchsorted(sheets, np.arange(len(self.sheet_names) + 1))
+        return [(name, rows[bounds[i]:bounds[i + 1]])
+                for i, name in enumerate(self.sheet_names) if bounds[i] < bounds[i + 1]]
+
+    def nbytes(self):
+        return self.postings.nbytes + self.offsets.nbytes + sum(len(token) for token in self.vocabulary)
@@ -0,0 +1,276 @@
+"""Excel解析结果的磁盘缓存
+
+每个工作簿的解析结果（工作表名 -> DataFrame）以 pickle protocol 5 存为一个文件，
+文件名由 源文件路径 + 修改时间 + 大小 + 内容哈希 决定。源文件未变化时直接读取缓存，
+无需重新解析XML。工作簿的搜索索引以同一个键另存为 .index.pkl，启动时不必重新建索引。
+"""
+import os
+import hashlib
+import pickle
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+CACHE_FORMAT_VERSION = 4
+STREAMING_THRESHOLD_BYTES = 50 * 1024 * 1024  # 超过此大小的.xlsx使用流式读取
+STREAMING_CHUNK_ROWS = 10000  # 流式读取时每块的行数
+INDEX_SUFFIX = '.index.pkl'
+
+
+def get_file_fingerprint(file_path, previous=None):
+    """计算文件指纹 (修改时间, 大小, 内容哈希)，时间和大小未变时沿用旧哈希"""
+    stat = os.stat(file_path)
+    if previous and previous[0] == stat.st_mtime_ns and previous[1] == stat.st_size:
+        return previous
+
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha1.update(chunk)
+    return stat.st_mtime_ns, stat.st_size, sha1.hexdigest()
+
+
+def read_excel_frames(file_path, streaming_threshold=None):
+    """读取所有工作表为DataFrame
+
+    空值保留为NaN，数值列因此能保持紧凑的NumPy类型；需要展示时再填充空字符串。
+    .xlsx 文件超过 streaming_threshold 字节时改用流式读取。
+    """
+    if streaming_threshold is None:
+        streaming_threshold = STREAMING_THRESHOLD_BYTES
+    if file_path.endswith('.xlsx') and os.path.getsize(file_path) >= streaming_threshold:
+        return read_excel_frames_streaming(file_path)
+    return pd.read_excel(file_path, sheet_name=None)  # 读取所有工作表
+
+
+def read_excel_frames_streaming(file_path, chunk_rows=STREAMING_CHUNK_ROWS):
+    """以openpyxl只读模式逐行读取大文件
+
+    不构建整个工作簿的DOM，每累计 chunk_rows 行就转换成一个类型紧凑的DataFrame块，
+    峰值内存取决于块大小和最终数据量，而不是XML大小。
+    """
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        return {worksheet.title: _read_sheet_streaming(worksheet, chunk_rows)
+                for worksheet in workbook.worksheets}
+    finally:
+        workbook.close()
+
+
+def read_excel_metadata(file_path):
+    """只读取 .xlsx 的工作表列表和尺寸，不解析单元格
+
+    返回 {工作表名: (数据行数, 列数)}，行数不含表头；尺寸取自工作表的dimension记录，
+    缺失时逐行计数。其他格式不支持，返回None。
+    """
+    if not file_path.endswith('.xlsx'):
+        return None
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        metadata = {}
+        for worksheet in workbook.worksheets:
+            max_row, max_column = worksheet.max_row, worksheet.max_column
+            if max_row is None or max_column is None:
+                max_row, max_column = 0, 0
+                for row in worksheet.iter_rows(values_only=True):
+                    max_row += 1
+                    max_column = max(max_column, len(row))
+            metadata[worksheet.title] = (max(max_row - 1, 0), max_column)
+        return metadata
+    finally:
+        workbook.close()
+
+
+def read_excel_sheet(file_path, sheet_name, streaming_threshold=None):
+    """读取单个工作表为DataFrame，大文件同样使用流式读取"""
+    if streaming_threshold is None:
+        streaming_threshold = STREAMING_THRESHOLD_BYTES
+    if file_path.endswith('.xlsx') and os.path.getsize(file_path) >= streaming_threshold:
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            return _read_sheet_streaming(workbook[sheet_name], STREAMING_CHUNK_ROWS)
+        finally:
+            workbook.close()
+    return pd.read_excel(file_path, sheet_name=sheet_name)
+
+
+def iter_excel_sheets(file_path, streaming_threshold=None):
+    """逐个读取工作表，生成 (工作表名, DataFrame)
+
+    同一时刻只有一个工作表的DataFrame在内存中，处理完上一个再读下一个；
+    大文件同样使用流式读取。
+    """
+    if streaming_threshold is None:
+        streaming_threshold = STREAMING_THRESHOLD_BYTES
+    if file_path.endswith('.xlsx') and os.path.getsize(file_path) >= streaming_threshold:
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            for worksheet in workbook.worksheets:
+                yield worksheet.title, _read_sheet_streaming(worksheet, STREAMING_CHUNK_ROWS)
+        finally:
+            workbook.close()
+        return
+
+    with pd.ExcelFile(file_path) as excel_file:  # 只打开一次，按需解析各工作表
+        for sheet_name in excel_file.sheet_names:
+            yield sheet_name, excel_file.parse(sheet_name)
+
+
+def _make_columns(header):
+    """按pandas的规则生成列名：空表头为 Unnamed: n，重复表头加 .1/.2 后缀"""
+    columns, seen = [], {}
+    for i, name in enumerate(header):
+        if name is None or name == '':
+            name = f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def _read_sheet_streaming(worksheet, chunk_rows):
+    rows = worksheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame()
+
+    columns = _make_columns(header)
+    width = len(columns)
+    empty_row = (None,) * width
+    chunks, buffer, blank_rows = [], [], 0
+    for row in rows:
+        # 只读模式下各行长度可能不同，补齐或截断到表头宽度
+        if len(row) != width:
+            row = (tuple(row) + empty_row)[:width]
+        # 与 pd.read_excel 一致，去掉末尾的空行：连续的空行等到后面出现数据时才写入，
+        # 末尾的空行不进入任何块，也就不会让整数列变成浮点数
+        if row == empty_row:
+            blank_rows += 1
+            continue
+        if blank_rows:
+            buffer.extend([empty_row] * blank_rows)
+            blank_rows = 0
+        buffer.append(row)
+        if len(buffer) >= chunk_rows:
+            chunks.append(pd.DataFrame(buffer, columns=columns).infer_objects())
+            buffer = []
+    if buffer or not chunks:
+        chunks.append(pd.DataFrame(buffer, columns=columns).infer_objects())
+
+    frame = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+    # 各块分别推断类型，某列在一块中全为空时该块是object，合并后整列会退化为object；
+    # 合并后再按整列的值推断一次。与 pd.read_excel 一致：整列为空的是float64，
+    # 混合类型列中的空单元格是NaN而不是None
+    for col in frame.columns[(frame.dtypes == object).to_numpy()]:
+        column = frame[col].infer_objects()
+        if column.dtype == object:
+            if len(frame) and column.isna().all():
+                column = column.astype('float64')
+            else:
+                column = column.where(column.notna(), np.nan)
+        frame[col] = column
+    return frame
+
+
+class SheetCache:
+    """以文件指纹为键的工作表磁盘缓存"""
+
+    def __init__(self, cache_dir=".excel_cache"):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def _path_key(file_path):
+        return hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:16]
+
+    def _entry_path(self, file_path, fingerprint, suffix='.pkl'):
+        mtime, size, content_hash = fingerprint
+        fingerprint_key = hashlib.sha1(
+            f"{mtime}|{size}|{content_hash}|{CACHE_FORMAT_VERSION}".encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{self._path_key(file_path)}-{fingerprint_key}{suffix}")
+
+    def get(self, file_path, fingerprint):
+        """读取缓存，未命中或缓存损坏时返回None"""
+        return self._read(self._entry_path(file_path, fingerprint))
+
+    def get_index(self, file_path, fingerprint):
+        """读取工作簿的搜索索引缓存，未命中或缓存损坏时返回None"""
+        return self._read(self._entry_path(file_path, fingerprint, INDEX_SUFFIX))
+
+    def load(self, file_path, fingerprint=None, streaming_threshold=None):
+        """读取工作簿的所有工作表，缓存未命中时解析并写入缓存"""
+        fingerprint = fingerprint or get_file_fingerprint(file_path)
+        frames = self.get(file_path, fingerprint)
+        if frames is None:
+            frames = read_excel_frames(file_path, streaming_threshold)
+            self.put(file_path, fingerprint, frames)
+        return frames
+
+    def put(self, file_path, fingerprint, frames):
+        """写入缓存，并删除同一源文件的旧版本缓存"""
+        self._write(file_path, self._entry_path(file_path, fingerprint), frames)
+
+    def put_index(self, file_path, fingerprint, index):
+        """写入工作簿的搜索索引缓存，并删除同一源文件的旧版本缓存"""
+        self._write(file_path, self._entry_path(file_path, fingerprint, INDEX_SUFFIX), index)
+
+    def _read(self, entry_path):
+        try:
+            with open(entry_path, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"缓存文件损坏，已忽略: {entry_path} ({e})")
+            self._remove(entry_path)
+            return None
+
+    def _write(self, file_path, entry_path, value):
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=5)
+            os.replace(tmp_path, entry_path)
+        except Exception as e:
+            print(f"写入缓存失败: {file_path} ({e})")
+            self._remove(tmp_path)
+            return
+
+        # 同一指纹的工作表缓存和索引缓存互相保留，其他指纹的都已过期
+        prefix = self._path_key(file_path) + '-'
+        current = os.path.basename(entry_path).split('.', 1)[0] + '.'
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and name.endswith('.pkl') and not name.startswith(current):
+                self._remove(os.path.join(self.cache_dir, name))
+
+    def discard(self, file_path):
+        """删除某个源文件的全部缓存"""
+        prefix = self._path_key(file_path) + '-'
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and name.endswith('.pkl'):
+                self._remove(os.path.join(self.cache_dir, name))
+
+    def prune(self, file_paths):
+        """删除不在 file_paths 中的源文件对应的缓存（源文件已被删除）"""
+        keep = {self._path_key(path) for path in file_paths}
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.pkl'):
+                continue
+            if name.split('-', 1)[0] not in keep:
+                self._remove(os.path.join(self.cache_dir, name))
+                removed += 1
+        return removed
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,178 @@
+"""工作表查询：筛选、多列排序、分组汇总
+
+查询通过URL参数描述，全部在DataFrame上用向量化操作执行：
+
+    filter=列名:操作:值    可重复，多个条件同时满足
+                          操作: eq ne gt ge lt le contains startswith in(值用|分隔) null notnull
+    sort=列名 / sort=-列名  可重复或用逗号分隔，-表示降序；分组后可按汇总列排序，如 -sum(数量)
+    group=列名            可重复，按这些列分组
+    agg=函数:列名          可重复，函数为 sum count mean；count 不带列名时统计行数
+
+执行顺序为 筛选 -> 分组汇总 -> 排序。
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+FILTER_OPS = ('eq', 'ne', 'gt', 'ge', 'lt', 'le', 'contains', 'startswith', 'in', 'null', 'notnull')
+AGG_FUNCS = ('sum', 'count', 'mean')
+FILTER_RE = re.compile(r'^(.*?):(%s)(?::(.*))?$' % '|'.join(FILTER_OPS), re.S)
+
+
+class QueryError(ValueError):
+    """查询参数错误，消息可直接返回给客户端"""
+
+
+def parse_query(args):
+    """把请求参数解析为可哈希的查询描述 (filters, sort, group, aggs)，用作缓存键"""
+    filters = []
+    for spec in args.getlist('filter'):
+        match = FILTER_RE.match(spec)
+        if not match:
+            raise QueryError(f"无法解析筛选条件: {spec}，格式为 列名:操作:值")
+        column, op, value = match.groups()
+        if value is None and op not in ('null', 'notnull'):
+            raise QueryError(f"筛选条件缺少值: {spec}")
+        filters.append((column, op, value))
+
+    sort = []
+    for spec in args.getlist('sort'):
+        for item in spec.split(','):
+            item = item.strip()
+            if item:
+                sort.append((item.lstrip('-'), not item.startswith('-')))
+
+    group = tuple(args.getlist('group'))
+
+    aggs = []
+    for spec in args.getlist('agg'):
+        func, _, column = spec.partition(':')
+        if func not in AGG_FUNCS:
+            raise QueryError(f"不支持的汇总函数: {func}，可用 {', '.join(AGG_FUNCS)}")
+        if not column and func != 'count':
+            raise QueryError(f"汇总函数 {func} 需要指定列名")
+        aggs.append((func, column))
+
+    return tuple(filters), tuple(sort), group, tuple(aggs)
+
+
+def resolve_column(frame, name):
+    """按列名取列标签，表头为数字时查询参数里是字符串形式"""
+    if name in frame.columns:
+        return name
+    for column in frame.columns:
+        if str(column) == name:
+            return column
+    raise QueryError(f"列不存在: {name}")
+
+
+def coerce_value(series, value):
+    """把查询值转换为与列类型可比较的值，失败时按文本比较"""
+    try:
+        if pd.api.types.is_bool_dtype(series):
+            return value.lower() in ('1', 'true', 'yes', '是')
+        if pd.api.types.is_numeric_dtype(series):
+            return float(value)
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return pd.Timestamp(value)
+    except ValueError:
+        pass
+    return None
+
+
+def filter_mask(frame, column, op, value):
+    """单个筛选条件对应的布尔数组，空值只满足 null 和 ne"""
+    series = frame[resolve_column(frame, column)]
+    if op == 'null':
+        return series.isna().to_numpy()
+    if op == 'notnull':
+        return series.notna().to_numpy()
+
+    if op in ('contains', 'startswith'):
+        text = series.astype(str).where(series.notna(), '')
+        if op == 'contains':
+            return text.str.contains(value, case=False, regex=False).to_numpy()
+        return text.str.lower().str.startswith(value.lower()).to_numpy()
+
+    if op == 'in':
+        values = value.split('|')
+        typed = [coerce_value(series, v) for v in values]
+        if all(v is not None for v in typed):
+            return series.isin(typed).to_numpy()
+        return series.astype(str).isin(values).to_numpy() & series.notna().to_numpy()
+
+    present = series.notna().to_numpy()
+    typed = coerce_value(series, value)
+    if typed is None:
+        # 文本列或混合类型列：大小比较且值为数字时按数值比较，否则按文本比较
+        number = pd.to_numeric(pd.Series([value]), errors='coerce')[0]
+        if op not in ('eq', 'ne') and not np.isnan(number):
+            series, typed = pd.to_numeric(series, errors='coerce'), number
+        else:
+            series, typed = series.astype(str), value
+
+    mask = getattr(series, f"__{op}__")(typed).to_numpy(dtype=bool)
+    return mask | ~present if op == 'ne' else mask & present
+
+
+def sort_key(series):
+    """混合类型的文本列无法直接比较，统一转为文本排序"""
+    if series.dtype == object:
+        return series.astype(str).where(series.notna())
+    return series
+
+
+def run_query(frame, query):
+    """执行查询，返回结果DataFrame（未分页）"""
+    filters, sort, group, aggs = query
+
+    if filters:
+        mask = np.ones(len(frame), dtype=bool)
+        for column, op, value in filters:
+            mask &= filter_mask(frame, column, op, value)
+        frame = frame[mask]
+
+    if group or aggs:
+        frame = aggregate(frame, group, aggs)
+
+    if sort:
+        columns = [resolve_column(frame, column) for column, _ in sort]
+        try:
+            frame = frame.sort_values(columns, ascending=[asc for _, asc in sort],
+                                      na_position='last', kind='stable')
+        except TypeError:
+            frame = frame.sort_values(columns, ascending=[asc for _, asc in sort],
+                                      na_position='last', kind='stable', key=sort_key)
+    return frame
+
+
+def aggregate(frame, group, aggs):
+    """分组汇总，汇总列命名为 函数(列名)；不分组时返回一行总计"""
+    group_columns = [resolve_column(frame, column) for column in group]
+    aggs = aggs or (('count', ''),)
+
+    values = {}
+    for func, column in aggs:
+        name = f"{func}({column})" if column else 'count'
+        if not column:
+            values[name] = pd.Series(1, index=frame.index)
+            continue
+        series = frame[resolve_column(frame, column)]
+        if func == 'count':
+            values[name] = series.notna().astype(np.int64)
+        else:
+            values[name] = pd.to_numeric(series, errors='coerce')
+
+    data = pd.DataFrame(values, index=frame.index)
+    funcs = {f"{func}({column})" if column else 'count': 'sum' if func == 'count' else func
+             for func, column in aggs}
+
+    if not group_columns:
+        return pd.DataFrame({name: [data[name].agg(func)] for name, func in funcs.items()})
+
+    for column in group_columns:
+        data[column] = frame[column]
+    # 分组键可能是混合类型无法比较，保持首次出现的顺序，排序交给 sort 参数
+    result = data.groupby(group_columns, dropna=False, sort=False).agg(funcs).reset_index()
+    return result[group_columns + list(funcs)]
@@ -0,0 +1,586 @@
+"""静态网站的数据文件与页面资源
+
+页面只需要一个很小的清单 manifest.json（文件、工作表、行列数），每个工作表的数据单独写成
+data/<编号>.<内容哈希>.json，点击工作表时才由页面请求，首屏大小与数据总量无关。
+
+数据文件为 {"columns": [...], "rows": [[...], ...]}（columnar 格式）。传入 precompress=('gzip', 'br')
+时同时写出 .gz / .br 预压缩副本，供开启了 gzip_static / brotli_static 的静态服务器直接发送；
+默认不写：GitHub Pages 等托管平台会自行压缩，不使用这些副本，只会让部署提交变大。
+
+增量生成：输出目录下的 .build-manifest.json 记录每个源文件的指纹和由它写出的数据文件，
+重新生成时内容未变的工作簿直接沿用上次的结果，不再解析；内容与已有文件相同的文件不重写，
+未变化的工作表数据文件逐字节相同、修改时间也不变，部署时只需提交真正变化的文件。
+
+搜索：每个工作簿预先建好倒排索引 search/<编号>.<内容哈希>.json（词表按UTF-16顺序排列，
+与浏览器的字符串比较一致；倒排列表为 工作表序号 << 32 | 行号 的差分编码），页面搜索时才逐个下载，
+在浏览器中做前缀查找和求交集。分词规则与服务端 /api/search 相同。清单中每个工作簿另有词首字符的
+位图（prefixes），查询词的首字符不在位图中的工作簿不可能命中，不下载它的索引。
+
+并行生成：build_static_site 用进程池同时处理多个有变化的工作簿，每个进程逐个读取工作表、
+立即写出数据文件，并为该表建好搜索索引（只有词表和倒排列表，比原数据小得多），读完所有工作表后
+一次合并为工作簿的索引；进程之间只传回清单条目；峰值内存取决于最大的单个工作表，而不是全部数据。
+
+缓存：页面内联的样式和脚本提取为 assets/app.<内容哈希>.css/js，数据文件名也带内容哈希，
+内容变化即换URL，可以长期缓存（_headers 为 Netlify / Cloudflare Pages 设置 immutable）。
+生成的 Service Worker (sw.js) 预缓存页面、资源和清单，再次访问时先用缓存（离线可用），
+后台更新清单；清单中某个工作表的哈希变化时，若该工作表已被缓存，则在后台下载新数据并通知页面。
+"""
+import os
+import re
+import gzip
+import json
+import hashlib
+from datetime import datetime
+from html import escape as html_escape
+from concurrent.futures import ProcessPoolExecutor
+
+from sheet_cache import get_file_fingerprint, iter_excel_sheets
+from search_index import WorkbookIndex
+from json_codec import RawJSON, dumps as json_dumps, arrays_json
+
+try:
+    import brotli
+except ImportError:  # 未安装brotli时只写gzip副本
+    brotli = None
+
+DATA_DIR = 'data'
+SEARCH_DIR = 'search'
+MANIFEST_NAME = 'manifest.json'
+BUILD_MANIFEST_NAME = '.build-manifest.json'
+BUILD_FORMAT_VERSION = 4  # 数据文件格式或路径规则变化时递增，旧的生成记录全部失效
+ASSETS_DIR = 'assets'
+VIEWER_TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'static_viewer.html')
+SERVICE_WORKER_NAME = 'sw.js'
+HEADERS_NAME = '_headers'
+PRECOMPRESS = ()  # 默认不写预压缩副本，自建静态服务器时传入 ('gzip', 'br')
+COMPRESSED_SUFFIX = {'gzip': '.gz', 'br': '.br'}
+PREFIX_BUCKETS = 256  # 词首字符位图的位数，字符码位取模，页面中的 PREFIX_BUCKETS 与此相同
+
+
+def content_hash(body):
+    """文件名中使用的内容哈希"""
+    return hashlib.sha1(body).hexdigest()[:16]
+
+
+def sheet_file_id(filename, sheet_name):
+    """工作表数据文件的编号，由文件名和工作表名决定，重新生成时保持不变"""
+    return hashlib.sha1(f"{filename}\0{sheet_name}".encode('utf-8')).hexdigest()[:16]
+
+
+def workbook_file_id(filename):
+    """工作簿搜索索引文件的编号"""
+    return hashlib.sha1(filename.encode('utf-8')).hexdigest()[:16]
+
+
+def write_bytes(path, body):
+    """先写临时文件再替换，页面不会读到写了一半的文件；内容相同时不重写，返回是否写入"""
+    try:
+        if os.path.getsize(path) == len(body):
+            with open(path, 'rb') as f:
+                if f.read() == body:
+                    return False
+    except OSError:
+        pass
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(body)
+    os.replace(tmp_path, path)
+    return True
+
+
+def available_encodings(precompress=PRECOMPRESS):
+    """实际能写出的预压缩格式，未安装brotli时去掉br"""
+    return tuple(encoding for encoding in precompress
+                 if encoding == 'gzip' or (encoding == 'br' and brotli is not None))
+
+
+def write_precompressed(path, body, precompress=PRECOMPRESS):
+    """写出预压缩副本，返回实际写出的文件路径"""
+    paths = []
+    for encoding in available_encodings(precompress):
+        if encoding == 'gzip':
+            # mtime=0，内容不变时压缩结果也逐字节相同
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        else:
+            compressed = brotli.compress(body, quality=11)
+        write_bytes(path + COMPRESSED_SUFFIX[encoding], compressed)
+        paths.append(path + COMPRESSED_SUFFIX[encoding])
+    return paths
+
+
+def write_sheet_data(output_dir, filename, sheet_name, frame, precompress=PRECOMPRESS):
+    """写出一个工作表的数据文件，返回清单中该工作表的条目"""
+    body = json_dumps({'columns': list(frame.columns), 'rows': arrays_json(frame)})
+    body_hash = content_hash(body)
+    relative_path = f"{DATA_DIR}/{sheet_file_id(filename, sheet_name)}.{body_hash}.json"
+    path = os.path.join(output_dir, DATA_DIR, os.path.basename(relative_path))
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_bytes(path, body)
+    write_precompressed(path, body, precompress)
+    return {
+        'path': relative_path,
+        'hash': body_hash,
+        'bytes': len(body),
+        'row_count': len(frame),
+        'col_count': len(frame.columns)
+    }
+
+
+def prefix_bitmap(tokens):
+    """词首字符的位图（十六进制），第 码位 % PREFIX_BUCKETS 位表示有以该字符开头的词"""
+    bitmap = bytearray(PREFIX_BUCKETS // 8)
+    for token in tokens:
+        bit = ord(token[0]) % PREFIX_BUCKETS
+        bitmap[bit >> 3] |= 1 << (bit & 7)
+    return bitmap.hex()
+
+
+def write_search_index(output_dir, filename, index, precompress=PRECOMPRESS):
+    """写出一个工作簿的搜索索引分片（WorkbookIndex），返回清单中该工作簿的索引条目"""
+    offsets = index.offsets.tolist()
+    deltas = index.postings.copy()
+    deltas[1:] -= index.postings[:-1]
+    starts = index.offsets[:-1][index.offsets[:-1] < len(deltas)]
+    deltas[starts] = index.postings[starts]  # 每个词的第一项存原值
+
+    order = sorted(range(len(index.vocabulary)), key=lambda i: index.vocabulary[i].encode('utf-16-be'))
+    body = json_dumps({
+        'sheets': index.sheet_names,
+        'tokens': [index.vocabulary[i] for i in order],
+        # 逐个词转换为文本，不为全部数字一次性生成字符串列表
+        'postings': [RawJSON('[' + ','.join(map(str, deltas[offsets[i]:offsets[i + 1]].tolist())) + ']')
+                     for i in order]
+    })
+
+    body_hash = content_hash(body)
+    relative_path = f"{SEARCH_DIR}/{workbook_file_id(filename)}.{body_hash}.json"
+    path = os.path.join(output_dir, SEARCH_DIR, os.path.basename(relative_path))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_bytes(path, body)
+    write_precompressed(path, body, precompress)
+    return {'path': relative_path, 'hash': body_hash, 'bytes': len(body), 'tokens': len(index.vocabulary),
+            'prefixes': prefix_bitmap(index.vocabulary)}
+
+
+def write_manifest(output_dir, manifest):
+    """写出清单 manifest.json：{'generated': 时间, 'files': {文件名: {工作表名: 条目}},
+    'search': {文件名: 索引条目}}
+
+    数据与上次相同时沿用上次的生成时间，清单和页面都保持逐字节不变。
+    """
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    previous = read_json(path) or {}
+    manifest.setdefault('search', {})
+    if (previous.get('files') == manifest['files'] and previous.get('search') == manifest['search']
+            and 'generated' in previous):
+        manifest['generated'] = previous['generated']
+    else:
+        manifest['generated'] = datetime.now().strftime('%Y-%m-%d %H:%M')
+    write_bytes(path, json_dumps({'generated': manifest['generated'], 'files': manifest['files'],
+                                  'search': manifest['search']}))
+    return path
+
+
+def read_json(path):
+    """读取JSON文件，不存在或已损坏时返回None"""
+    try:
+        with open(path, 'rb') as f:
+            return json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def prune_data_files(output_dir, manifest, precompress=PRECOMPRESS):
+    """删除清单中已不存在的数据文件和搜索索引（源文件或工作表已被删除、内容已变化）
+
+    只保留 precompress 中的预压缩副本，关闭预压缩后旧的 .gz / .br 文件一并删除。
+    """
+    removed = 0
+    for directory, entries in (
+            (DATA_DIR, [entry for sheets in manifest['files'].values() for entry in sheets.values()]),
+            (SEARCH_DIR, list(manifest.get('search', {}).values()))):
+        keep = set()
+        for entry in entries:
+            name = os.path.basename(entry['path'])
+            keep.add(name)
+            keep.update(name + COMPRESSED_SUFFIX[encoding] for encoding in available_encodings(precompress))
+        removed += remove_unlisted(os.path.join(output_dir, directory), keep)
+    return removed
+
+
+def remove_unlisted(directory, keep):
+    """删除目录中不在 keep（文件名集合）里的文件，返回删除的数量"""
+    if not os.path.isdir(directory):
+        return 0
+    removed = 0
+    for name in os.listdir(directory):
+        if name not in keep:
+            try:
+                os.remove(os.path.join(directory, name))
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+class BuildManifest:
+    """上次生成的记录：源文件指纹 -> 写出的数据文件，用于跳过未变化的工作簿"""
+
+    def __init__(self, output_dir, precompress=PRECOMPRESS):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, BUILD_MANIFEST_NAME)
+        self.precompress = available_encodings(precompress)
+        previous = read_json(self.path) or {}
+        if (previous.get('version') == BUILD_FORMAT_VERSION
+                and tuple(previous.get('precompress', ())) == self.precompress):
+            self.previous = previous.get('files', {})
+        else:
+            self.previous = {}  # 格式或压缩设置变化，全部重新生成
+        self.files = {}
+
+    def fingerprint(self, filename, file_path):
+        """源文件指纹，修改时间和大小未变时沿用记录中的内容哈希"""
+        recorded = self.previous.get(filename, {}).get('fingerprint')
+        return get_file_fingerprint(file_path, tuple(recorded) if recorded else None)
+
+    def reuse(self, filename, fingerprint):
+        """源文件内容未变且上次写出的文件都还在时，返回上次的记录
+        {'sheets': {工作表名: 条目}, 'search': 索引条目}，否则返回None"""
+        recorded = self.previous.get(filename)
+        if not recorded or recorded['fingerprint'][2] != fingerprint[2]:
+            return None
+        suffixes = [COMPRESSED_SUFFIX[encoding] for encoding in self.precompress]
+        for entry in list(recorded['sheets'].values()) + [recorded['search']]:
+            path = os.path.join(self.output_dir, entry['path'])
+            try:
+                if os.path.getsize(path) != entry['bytes']:
+                    return None
+            except OSError:
+                return None
+            if not all(os.path.exists(path + suffix) for suffix in suffixes):
+                return None
+        self.record(filename, fingerprint, recorded['sheets'], recorded['search'])
+        return recorded
+
+    def record(self, filename, fingerprint, sheets, search):
+        self.files[filename] = {'fingerprint': list(fingerprint), 'sheets': sheets, 'search': search}
+
+    def save(self):
+        """只保留本次生成中出现的源文件"""
+        write_bytes(self.path, json_dumps({
+            'version': BUILD_FORMAT_VERSION,
+            'precompress': list(self.precompress),
+            'files': self.files
+        }, indent=True))
+
+
+def build_workbook(output_dir, filename, file_path, precompress=PRECOMPRESS):
+    """处理一个工作簿（在进程池中运行）：逐个工作表读取并写出数据文件，最后写出搜索索引
+
+    同一时刻只持有一个工作表的DataFrame。返回 {'sheets': {工作表名: 条目},
+    'search': 索引条目, 'errors': {工作表名: 错误信息}}。
+    """
+    sheets, errors, indexes = {}, {}, []
+    for sheet_name, frame in iter_excel_sheets(file_path):
+        try:
+            sheet_index = WorkbookIndex({sheet_name: frame})
+            sheets[sheet_name] = write_sheet_data(output_dir, filename, sheet_name, frame, precompress)
+            # 各工作表的索引只有词表和倒排列表，比原数据小得多，全部读完后一次合并
+            indexes.append(sheet_index)
+        except Exception as e:
+            sheets.pop(sheet_name, None)
+            errors[sheet_name] = str(e)
+        del frame
+    search = write_search_index(output_dir, filename, WorkbookIndex.merge(indexes), precompress)
+    return {'sheets': sheets, 'search': search, 'errors': errors}
+
+
+def build_static_site(output_dir, excel_folder="excel_files", workers=None, precompress=PRECOMPRESS):
+    """生成静态网站的数据部分：各工作表数据文件、搜索索引和清单，返回清单
+
+    内容未变化的工作簿沿用上次的结果；有变化的用 workers 个进程并行处理（默认为CPU核数）。
+    页面由调用方生成后交给 write_site 写出。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    build = BuildManifest(output_dir, precompress)
+    filenames = sorted(filename for filename in os.listdir(excel_folder)
+                       if filename.endswith(('.xlsx', '.xls')))
+
+    results, changed = {}, {}
+    for filename in filenames:
+        file_path = os.path.join(excel_folder, filename)
+        try:
+            fingerprint = build.fingerprint(filename, file_path)
+        except OSError as e:
+            print(f"❌ 处理文件 {filename} 时出错: {e}")
+            continue
+        recorded = build.reuse(filename, fingerprint)
+        if recorded is not None:
+            results[filename] = recorded
+            print(f"⏭️ 未变化，跳过: {filename}")
+        else:
+            changed[filename] = fingerprint
+
+    def publish(filename, result):
+        for sheet_name, error in result['errors'].items():
+            print(f"❌ 处理工作表 {filename}/{sheet_name} 时出错: {error}")
+        results[filename] = result
+        if not result['errors']:  # 有工作表出错时不记录，下次重新处理
+            build.record(filename, changed[filename], result['sheets'], result['search'])
+        print(f"✅ 已处理: {filename} ({len(result['sheets'])} 个工作表)")
+
+    workers = min(workers or os.cpu_count() or 1, len(changed))
+    if workers <= 1:
+        for filename in changed:
+            try:
+                publish(filename, build_workbook(output_dir, filename, os.path.join(excel_folder, filename),
+                                                 build.precompress))
+            except Exception as e:
+                print(f"❌ 处理文件 {filename} 时出错: {e}")
+    elif changed:
+        print(f"使用 {workers} 个进程并行处理 {len(changed)} 个文件...")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                filename: executor.submit(build_workbook, output_dir, filename,
+                                          os.path.join(excel_folder, filename), build.precompress)
+                for filename in changed
+            }
+            for filename, future in futures.items():
+                try:
+                    publish(filename, future.result())
+                except Exception as e:
+                    print(f"❌ 处理文件 {filename} 时出错: {e}")
+
+    # 清单按文件名排序，与处理完成的先后无关
+    manifest = {
+        'files': {filename: results[filename]['sheets'] for filename in filenames if filename in results},
+        'search': {filename: results[filename]['search'] for filename in filenames if filename in results}
+    }
+    # 源文件夹被清空时也写出空清单，已部署的页面不再列出数据文件已被删除的工作簿
+    write_manifest(output_dir, manifest)
+    prune_data_files(output_dir, manifest, build.precompress)
+    build.save()
+    return manifest
+
+
+def render_viewer_page(manifest):
+    """静态查看器页面（main-github.py 使用）：在模板中填入文件数和生成时间"""
+    with open(VIEWER_TEMPLATE, encoding='utf-8') as f:
+        template = f.read()
+    return (template.replace('__FILE_COUNT__', str(len(manifest['files'])))
+            .replace('__GENERATED__', html_escape(manifest.get('generated', ''))))
+
+
+INLINE_STYLE_RE = re.compile(r'<style>(.*?)</style>', re.S)
+INLINE_SCRIPT_RE = re.compile(r'<script>(.*?)</script>', re.S)
+CDN_ASSET_RE = re.compile(r'<(?:link|script)\b[^>]*?\b(?:href|src)="(https://[^"]+)"')
+
+HEADERS = """/assets/*
+  Cache-Control: public, max-age=31536000, immutable
+/data/*
+  Cache-Control: public, max-age=31536000, immutable
+/search/*
+  Cache-Control: public, max-age=31536000, immutable
+/manifest.json
+  Cache-Control: no-cache
+/sw.js
+  Cache-Control: no-cache
+"""
+
+SERVICE_WORKER_REGISTER = """
+// 注册 Service Worker：再次访问时先使用缓存，离线也能打开
+if ('serviceWorker' in navigator) {
+    window.addEventListener('load', () => {
+        navigator.serviceWorker.register('sw.js').catch(error => console.warn('Service Worker 注册失败:', error));
+    });
+}
+"""
+
+SERVICE_WORKER = r"""// 由生成脚本自动生成，请勿手动修改
+const VERSION = __VERSION__;
+const STATIC_CACHE = `excel-viewer-static-${VERSION}`;
+const DATA_CACHE = 'excel-viewer-data';  // 工作表数据跨版本保留，按清单清理
+const PRECACHE = __PRECACHE__;
+const CDN_ASSETS = __CDN_ASSETS__;
+const MANIFEST = __MANIFEST__;
+const HASHED_FILE = /\/(assets\/[^/]+\.[0-9a-f]{16}\.(css|js)|(data|search)\/[0-9a-f]{16}\.[0-9a-f]{16}\.json)$/;
+
+const scoped = path => new URL(path, self.registration.scope).href;
+
+self.addEventListener('install', event => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(STATIC_CACHE);
+        await cache.addAll(PRECACHE.map(scoped));
+        // CDN不可用时不影响安装，页面照常从网络加载
+        await Promise.allSettled(CDN_ASSETS.map(url => cache.add(new Request(url, { mode: 'cors' }))));
+        if (MANIFEST) {
+            const data = await caches.open(DATA_CACHE);
+            await data.add(scoped(MANIFEST)).catch(() => {});
+        }
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        for (const key of await caches.keys()) {
+            if (key.startsWith('excel-viewer-static-') && key !== STATIC_CACHE) await caches.delete(key);
+        }
+        await self.clients.claim();
+    })());
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+    const url = new URL(request.url);
+
+    if (url.origin !== self.location.origin) {
+        event.respondWith(cacheFirst(STATIC_CACHE, request));  // CDN资源的URL带版本号，内容不会变化
+    } else if (MANIFEST && url.href.split('?')[0] === scoped(MANIFEST)) {
+        event.respondWith(manifestResponse(event));
+    } else if (request.mode === 'navigate' || url.href === scoped('./') || url.href === scoped('index.html')) {
+        event.respondWith(staleWhileRevalidate(event, scoped('index.html')));
+    } else if (HASHED_FILE.test(url.pathname)) {
+        // 文件名带内容哈希，缓存后永不过期
+        event.respondWith(cacheFirst(url.pathname.includes('/assets/') ? STATIC_CACHE : DATA_CACHE, request));
+    }
+});
+
+async function cacheFirst(cacheName, request) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(request, { ignoreSearch: true });
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (response.ok || response.type === 'opaque') await cache.put(request, response.clone());
+    return response;
+}
+
+// 先返回缓存的页面，同时在后台更新
+async function staleWhileRevalidate(event, key) {
+    const cache = await caches.open(STATIC_CACHE);
+    const cached = await cache.match(key);
+    const update = fetch(event.request).then(async response => {
+        if (response.ok) await cache.put(key, response.clone());
+        return response;
+    });
+    if (!cached) return update;
+    event.waitUntil(update.catch(() => {}));
+    return cached;
+}
+
+// 清单：先返回缓存，后台取最新清单；哈希变化的工作表在后台刷新后通知页面
+async function manifestResponse(event) {
+    const cache = await caches.open(DATA_CACHE);
+    const key = scoped(MANIFEST);
+    const cached = await cache.match(key);
+    const previous = cached ? await cached.clone().json().catch(() => null) : null;
+
+    const update = fetch(event.request, { cache: 'no-cache' }).then(async response => {
+        if (!response.ok) return response;
+        const fresh = await response.clone().json();
+        await cache.put(key, response.clone());
+        if (previous && (JSON.stringify(previous.files) !== JSON.stringify(fresh.files)
+                         || JSON.stringify(previous.search) !== JSON.stringify(fresh.search))) {
+            await refreshSheets(cache, previous, fresh);
+            for (const client of await self.clients.matchAll()) {
+                client.postMessage({ type: 'manifest-updated', manifest: fresh });
+            }
+        }
+        return response;
+    });
+
+    if (!cached) return update;
+    event.waitUntil(update.catch(() => {}));
+    return cached;
+}
+
+async function refreshSheets(cache, previous, fresh) {
+    const current = new Set();
+    // 只刷新看过（已缓存）的工作表和用过的搜索索引，其余等到用到时再下载
+    const refresh = async (old, entry) => {
+        current.add(scoped(entry.path));
+        if (old && old.hash !== entry.hash && await cache.match(scoped(old.path))) {
+            await cache.add(scoped(entry.path)).catch(() => {});
+        }
+    };
+    for (const [filename, sheets] of Object.entries(fresh.files)) {
+        for (const [sheetName, entry] of Object.entries(sheets)) {
+            await refresh((previous.files[filename] || {})[sheetName], entry);
+        }
+    }
+    for (const [filename, entry] of Object.entries(fresh.search || {})) {
+        await refresh((previous.search || {})[filename], entry);
+    }
+    for (const request of await cache.keys()) {
+        if (request.url !== scoped(MANIFEST) && !current.has(request.url)) await cache.delete(request);
+    }
+}
+"""
+
+
+def write_asset(output_dir, name, extension, text):
+    """写出带内容哈希的资源文件，返回相对路径"""
+    body = text.encode('utf-8')
+    relative_path = f"{ASSETS_DIR}/{name}.{content_hash(body)}.{extension}"
+    os.makedirs(os.path.join(output_dir, ASSETS_DIR), exist_ok=True)
+    write_bytes(os.path.join(output_dir, relative_path), body)
+    return relative_path
+
+
+def externalize_assets(output_dir, html):
+    """把页面内联的样式和脚本提取为资源文件，返回 (新页面, 资源相对路径列表)
+
+    Service Worker 的注册代码附加在最后一段脚本之后。
+    """
+    assets = []
+
+    def replace_style(match):
+        path = write_asset(output_dir, 'app', 'css', match.group(1).strip() + '\n')
+        assets.append(path)
+        return f'<link href="{path}" rel="stylesheet">'
+
+    html = INLINE_STYLE_RE.sub(replace_style, html)
+
+    matches = list(INLINE_SCRIPT_RE.finditer(html))
+    parts, last = [], 0
+    for i, match in enumerate(matches):
+        text = match.group(1).strip() + '\n'
+        if i == len(matches) - 1:
+            text += SERVICE_WORKER_REGISTER
+        path = write_asset(output_dir, 'app', 'js', text)
+        assets.append(path)
+        parts += [html[last:match.start()], f'<script src="{path}"></script>']
+        last = match.end()
+    parts.append(html[last:])
+    return ''.join(parts), assets
+
+
+def write_service_worker(output_dir, html, assets, manifest_name=None):
+    """生成 sw.js，版本号由页面和资源决定，内容变化时浏览器会安装新版本"""
+    precache = ['index.html'] + assets
+    cdn_assets = CDN_ASSET_RE.findall(html)
+    version = content_hash(json.dumps([html, precache, cdn_assets, manifest_name]).encode('utf-8'))
+    script = (SERVICE_WORKER
+              .replace('__VERSION__', json.dumps(version))
+              .replace('__PRECACHE__', json.dumps(precache))
+              .replace('__CDN_ASSETS__', json.dumps(cdn_assets))
+              .replace('__MANIFEST__', json.dumps(manifest_name)))
+    path = os.path.join(output_dir, SERVICE_WORKER_NAME)
+    write_bytes(path, script.encode('utf-8'))
+    return path
+
+
+def write_site(output_dir, html, manifest_name=None):
+    """写出页面：样式和脚本提取为带哈希的资源，并生成 sw.js 和 _headers，返回页面路径
+
+    manifest_name 为按需加载的工作表清单（相对路径），数据全部内嵌在页面中时为None。
+    """
+    html, assets = externalize_assets(output_dir, html)
+    index_path = os.path.join(output_dir, 'index.html')
+    write_bytes(index_path, html.encode('utf-8'))  # 内容未变时不重写
+    write_service_worker(output_dir, html, assets, manifest_name)
+    write_bytes(os.path.join(output_dir, HEADERS_NAME), HEADERS.encode('utf-8'))
+    remove_unlisted(os.path.join(output_dir, ASSETS_DIR), {os.path.basename(path) for path in assets})
+    return index_path
@@ -0,0 +1,48 @@
+"""json_codec 的单元格编码：各后端输出合法JSON，空值与日期时间与首屏页面显示一致"""
+import os
+import sys
+import json
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import json_codec  # noqa: E402
+from json_codec import arrays_json, records_json  # noqa: E402
+
+BACKENDS = ['json'] + [name for name in ('orjson', 'msgspec') if getattr(json_codec, name) is not None]
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, monkeypatch):
+    monkeypatch.setattr(json_codec, 'BACKEND', request.param)
+    return request.param
+
+
+def decode(fragment):
+    return json.loads(json_codec.dumps({'rows': fragment}))['rows']
+
+
+def test_nullable_integer_column(backend):
+    frame = pd.DataFrame({'数量': pd.array([1, None, 3], dtype='Int64')})
+    assert decode(arrays_json(frame)) == [[1], [''], [3]]
+    assert decode(records_json(frame)) == [{'数量': 1}, {'数量': ''}, {'数量': 3}]
+
+
+def test_nullable_extension_columns(backend):
+    frame = pd.DataFrame({
+        'f': pd.array([1.5, None], dtype='Float64'),
+        'b': pd.array([True, None], dtype='boolean'),
+        's': pd.array(['a', None], dtype='string'),
+        'o': ['x', pd.NA]
+    })
+    assert decode(arrays_json(frame)) == [[1.5, True, 'a', 'x'], ['', '', '', '']]
+
+
+def test_datetimes_match_template_text(backend):
+    frame = pd.DataFrame({
+        '日期': pd.to_datetime(['2024-01-01', None]),
+        '时间': pd.to_datetime(['2024-01-01 08:30:00.250', None])
+    })
+    assert decode(arrays_json(frame)) == [['2024-01-01 00:00:00', '2024-01-01 08:30:00.250000'], ['', '']]
+    assert decode(arrays_json(frame))[0] == [str(value) for value in frame.iloc[0]]
@@ -0,0 +1,135 @@
+"""main 中的内存缓存、数据快照和后台重载线程"""
+import os
+import sys
+import time
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main  # noqa: E402
+from main import DataSnapshot, LRUCache, ReloadWorker  # noqa: E402
+
+
+def test_lru_cache_evicts_least_recently_used_by_bytes():
+    cache = LRUCache(max_bytes=100)
+    cache.put(('a.xlsx', 'S1', 1), 'a', 40)
+    cache.put(('b.xlsx', 'S1', 1), 'b', 40)
+    assert cache.get(('a.xlsx', 'S1', 1)) == 'a'  # a 变为最近使用
+    cache.put(('c.xlsx', 'S1', 1), 'c', 40)
+
+    assert ('b.xlsx', 'S1', 1) not in cache
+    assert cache.get(('a.xlsx', 'S1', 1)) == 'a'
+    assert cache.stats()['bytes'] == 80
+    assert cache.get(('b.xlsx', 'S1', 1)) is None
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_lru_cache_replace_and_oversized_entries():
+    cache = LRUCache(max_bytes=100)
+    cache.put('k', 'old', 30)
+    cache.put('k', 'new', 50)
+    assert cache.get('k') == 'new'
+    assert cache.total_bytes == 50
+
+    cache.put('huge', 'x', 101)  # 超过上限的条目不缓存，也不挤掉已有条目
+    assert 'huge' not in cache
+    assert 'k' in cache
+
+
+def test_lru_cache_invalidate_file():
+    cache = LRUCache()
+    cache.put(('a.xlsx', 'S1', 1, 'sheet'), 1, 10)
+    cache.put(('a.xlsx', None, 1, 'view'), 2, 10)
+    cache.put(('b.xlsx', 'S1', 2, 'sheet'), 3, 10)
+    cache.put((None, None, 2, 'index'), 4, 10)  # 依赖全部文件的条目
+
+    cache.invalidate('a.xlsx')
+    assert [key[0] for key in cache._entries] == ['b.xlsx']
+    assert cache.total_bytes == 10
+
+
+def test_snapshot_versions():
+    empty = DataSnapshot()
+    first = empty.with_file('a.xlsx', {'S1': 'sheet-a'}, '2024-01-01 00:00:00')
+    second = first.with_file('b.xlsx', {'S1': 'sheet-b'}, '2024-01-02 00:00:00')
+    third = second.with_file('a.xlsx', {'S1': 'sheet-a2'}, '2024-01-03 00:00:00')
+    removed = third.without_file('b.xlsx')
+
+    assert [snap.version for snap in (empty, first, second, third, removed)] == [0, 1, 2, 3, 4]
+    assert dict(third.file_versions) == {'a.xlsx': 3, 'b.xlsx': 2}
+    assert third.last_modified['a.xlsx'] == '2024-01-03 00:00:00'
+    assert dict(removed.file_versions) == {'a.xlsx': 3}
+    assert 'b.xlsx' not in removed.last_modified
+
+    # 旧快照不受新快照影响，且只读
+    assert second.excel_data['a.xlsx']['S1'] == 'sheet-a'
+    assert dict(second.file_versions) == {'a.xlsx': 1, 'b.xlsx': 2}
+    with pytest.raises(TypeError):
+        second.excel_data['c.xlsx'] = {}
+
+
+@pytest.fixture
+def reload_calls(monkeypatch, tmp_path):
+    """替换加载函数，只记录后台线程的调用"""
+    calls = []
+    done = threading.Event()
+    monkeypatch.setattr(main, 'cache_dir', None)
+    monkeypatch.setattr(main, 'load_excel_file', lambda path: calls.append(('load', path)))
+    monkeypatch.setattr(main, 'remove_excel_file', lambda filename: calls.append(('remove', filename)))
+    monkeypatch.setattr(main, 'write_shared_state', lambda: (calls.append(('state',)), done.set()))
+    existing = tmp_path / 'a.xlsx'
+    existing.write_bytes(b'')
+    return calls, done, str(existing), str(tmp_path / 'gone.xlsx')
+
+
+def test_reload_worker_batches_due_files():
+    worker = ReloadWorker(debounce=0.05)
+    for _ in range(5):
+        worker.submit('a.xlsx')
+    worker.submit('b.xlsx')
+    time.sleep(0.1)
+
+    # 静默期内的多次事件合并为一次，已过静默期的文件一起取出
+    assert sorted(worker._next_batch()) == ['a.xlsx', 'b.xlsx']
+    assert worker.stats()['events_received'] == 6
+    assert worker.stats()['pending'] == 0
+
+    worker.stop()
+    assert worker._next_batch() is None
+
+
+def test_reload_worker_writes_state_once_per_batch(reload_calls):
+    calls, done, existing, missing = reload_calls
+    worker = ReloadWorker(debounce=0.2)
+    worker.submit(existing)
+    worker.submit(missing)
+    time.sleep(0.25)
+    worker.start()
+    try:
+        assert done.wait(5)
+    finally:
+        worker.stop()
+        worker.join(5)
+
+    assert sorted(calls[:2]) == [('load', existing), ('remove', 'gone.xlsx')]
+    assert calls[2:] == [('state',)]
+    assert worker.stats()['reloads_executed'] == 2
+    assert not worker.is_alive()
+
+
+def test_reload_worker_waits_for_quiet_period(reload_calls):
+    calls, done, existing, _ = reload_calls
+    worker = ReloadWorker(debounce=0.3)
+    worker.start()
+    try:
+        worker.submit(existing)
+        time.sleep(0.15)
+        worker.submit(existing)  # 推迟处理时间
+        time.sleep(0.25)
+        assert calls == []
+        assert done.wait(5)
+    finally:
+        worker.stop()
+        worker.join(5)
+    assert calls == [('load', existing), ('state',)]
@@ -0,0 +1,90 @@
+"""search_index 的分词、前缀查找、中文查询以及逐表索引合并"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from search_index import WorkbookIndex, query_tokens, tokenize  # noqa: E402
+
+
+@pytest.fixture
+def frames():
+    return {
+        '订单': pd.DataFrame({
+            '城市': ['上海浦东', '北京', '上海', None],
+            '客户': ['Alpha Ltd', 'alphabet', 'Beta', 'gamma'],
+            '数量': [1.0, 2.5, 3.0, np.nan]
+        }),
+        '空表': pd.DataFrame(),
+        '库存': pd.DataFrame({
+            '仓库': ['浦东仓', '北京仓'],
+            '编号': [1001, 1002]
+        })
+    }
+
+
+def hits(index, query):
+    return [(sheet, rows.tolist()) for sheet, rows in index.decode(index.search(query_tokens(query)))]
+
+
+def test_tokenize_cjk_bigrams():
+    assert tokenize('上海浦东 Alpha_1') == ['上海', '海浦', '浦东', '东', 'alpha', '1']
+    assert tokenize('上海', query=True) == ['上海']
+    assert tokenize('上', query=True) == ['上']
+    assert query_tokens('上海 上海 alpha') == ['上海', 'alpha']
+
+
+def test_prefix_search(frames):
+    index = WorkbookIndex(frames)
+    assert hits(index, 'alp') == [('订单', [0, 1])]
+    assert hits(index, 'alpha ltd') == [('订单', [0])]
+    assert hits(index, 'zeta') == []
+    # 整数值的浮点数按整数建索引
+    assert hits(index, '3') == [('订单', [2])]
+    assert hits(index, '2.5') == [('订单', [1])]
+    assert hits(index, '100') == [('库存', [0, 1])]
+
+
+def test_cjk_terms(frames):
+    index = WorkbookIndex(frames)
+    assert hits(index, '上海') == [('订单', [0, 2])]
+    assert hits(index, '浦东') == [('订单', [0]), ('库存', [0])]
+    assert hits(index, '海浦东') == [('订单', [0])]
+    # 单字通过末字和双字词的前缀命中任意位置
+    assert hits(index, '东') == [('订单', [0]), ('库存', [0])]
+    assert hits(index, '仓') == [('库存', [0, 1])]
+    assert hits(index, '北京 仓') == [('库存', [1])]
+
+
+def test_cell_count_skips_empty_cells(frames):
+    assert WorkbookIndex(frames).cell_count == 10 + 4
+
+
+def assert_same_index(merged, full):
+    assert merged.sheet_names == full.sheet_names
+    assert merged.cell_count == full.cell_count
+    assert merged.vocabulary == full.vocabulary
+    np.testing.assert_array_equal(merged.offsets, full.offsets)
+    np.testing.assert_array_equal(merged.postings, full.postings)
+
+
+def test_merge_per_sheet_equals_full_build(frames):
+    full = WorkbookIndex(frames)
+    merged = WorkbookIndex.merge([WorkbookIndex({name: frame}) for name, frame in frames.items()])
+    assert_same_index(merged, full)
+
+
+def test_merge_groups_of_sheets(frames):
+    names = list(frames)
+    merged = WorkbookIndex.merge([WorkbookIndex({name: frames[name] for name in names[:2]}),
+                                  WorkbookIndex({names[2]: frames[names[2]]})])
+    assert_same_index(merged, WorkbookIndex(frames))
+
+
+def test_merge_empty():
+    merged = WorkbookIndex.merge([])
+    assert_same_index(merged, WorkbookIndex({}))
+    assert hits(merged, 'a') == []
@@ -0,0 +1,101 @@
+"""sheet_cache 的流式读取（与 pd.read_excel 结果一致）和按指纹的磁盘缓存"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from search_index import WorkbookIndex  # noqa: E402
+from sheet_cache import (SheetCache, get_file_fingerprint, iter_excel_sheets,  # noqa: E402
+                         read_excel_frames_streaming, read_excel_sheet)
+
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    """两个工作表：各列在不同的行开始有值，跨越多个流式读取块"""
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = '明细'
+    sheet.append(['编号', '晚开始的整数', '全空', '日期', '混合', '布尔', '文本', None, '编号'])
+    for i in range(25):
+        late = i >= 12
+        sheet.append([i, i if late else None, None, datetime(2024, 1, 1) + timedelta(days=i) if late else None,
+                      i if i % 2 else f"s{i}", bool(i % 2), f"文本{i}" if late else None, i * 0.5, -i])
+    sheet.append([None] * 9)  # 末尾的空行与 pd.read_excel 一样去掉
+
+    short = workbook.create_sheet('短行')
+    short.append(['a', 'b', 'c'])
+    short.append([1])
+    short.append([2, 'x', 3.5])
+
+    workbook.create_sheet('空表')
+    path = tmp_path / '测试.xlsx'
+    workbook.save(path)
+    return str(path)
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 5, 10000])
+def test_streaming_matches_read_excel(workbook_path, chunk_rows):
+    expected = pd.read_excel(workbook_path, sheet_name=None)
+    frames = read_excel_frames_streaming(workbook_path, chunk_rows)
+    assert list(frames) == list(expected)
+    for sheet_name, frame in expected.items():
+        if frame.empty and not len(frame.columns):
+            assert frames[sheet_name].empty
+            continue
+        pd.testing.assert_frame_equal(frames[sheet_name], frame)
+
+
+def test_iter_and_single_sheet_use_streaming(workbook_path):
+    expected = pd.read_excel(workbook_path, sheet_name=None)
+    streamed = dict(iter_excel_sheets(workbook_path, streaming_threshold=0))
+    assert list(streamed) == list(expected)
+    pd.testing.assert_frame_equal(streamed['明细'], expected['明细'])
+    pd.testing.assert_frame_equal(read_excel_sheet(workbook_path, '短行', streaming_threshold=0), expected['短行'])
+
+
+def test_cache_round_trip(workbook_path, tmp_path):
+    cache = SheetCache(str(tmp_path / 'cache'))
+    fingerprint = get_file_fingerprint(workbook_path)
+    assert cache.get(workbook_path, fingerprint) is None
+
+    frames = cache.load(workbook_path, fingerprint)
+    index = WorkbookIndex(frames)
+    cache.put_index(workbook_path, fingerprint, index)
+
+    cached = cache.get(workbook_path, fingerprint)
+    pd.testing.assert_frame_equal(cached['明细'], frames['明细'])
+    cached_index = cache.get_index(workbook_path, fingerprint)
+    assert cached_index.vocabulary == index.vocabulary
+    assert cached_index.postings.tolist() == index.postings.tolist()
+
+
+def test_new_fingerprint_replaces_old_entries(workbook_path, tmp_path):
+    cache = SheetCache(str(tmp_path / 'cache'))
+    old = get_file_fingerprint(workbook_path)
+    frames = cache.load(workbook_path, old)
+    cache.put_index(workbook_path, old, WorkbookIndex(frames))
+    assert len(os.listdir(cache.cache_dir)) == 2
+
+    new = (old[0] + 1, old[1], 'changed')
+    cache.put(workbook_path, new, frames)
+    assert cache.get(workbook_path, old) is None
+    assert cache.get_index(workbook_path, old) is None
+    assert cache.get(workbook_path, new) is not None
+
+    cache.discard(workbook_path)
+    assert os.listdir(cache.cache_dir) == []
+
+
+def test_corrupt_entry_is_ignored(workbook_path, tmp_path):
+    cache = SheetCache(str(tmp_path / 'cache'))
+    fingerprint = get_file_fingerprint(workbook_path)
+    cache.load(workbook_path, fingerprint)
+    for name in os.listdir(cache.cache_dir):
+        with open(os.path.join(cache.cache_dir, name), 'wb') as f:
+            f.write(b'not a pickle')
+    assert cache.get(workbook_path, fingerprint) is None
+    assert os.listdir(cache.cache_dir) == []
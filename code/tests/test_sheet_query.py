@@ -0,0 +1,121 @@
+"""sheet_query 的筛选、排序、分组汇总以及查询参数错误"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from werkzeug.datastructures import MultiDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sheet_query import QueryError, parse_query, run_query  # noqa: E402
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        '城市': ['上海', '北京', '上海', '广州', None],
+        '数量': [3, 10, np.nan, 7, 1],
+        '备注': ['A-1', 'b-2', 12, None, 'a-3'],
+        '日期': pd.to_datetime(['2024-01-03', '2024-01-01', None, '2024-02-01', '2024-01-02'])
+    })
+
+
+def query(frame, *pairs):
+    return run_query(frame, parse_query(MultiDict(pairs)))
+
+
+def test_parse_query_is_hashable():
+    parsed = parse_query(MultiDict([('filter', '城市:eq:上海'), ('sort', '-数量, 城市'),
+                                    ('group', '城市'), ('agg', 'sum:数量'), ('agg', 'count')]))
+    assert parsed == ((('城市', 'eq', '上海'),), (('数量', False), ('城市', True)), ('城市',),
+                      (('sum', '数量'), ('count', '')))
+    hash(parsed)
+
+
+@pytest.mark.parametrize('spec, expected', [
+    ('城市:eq:上海', [0, 2]),
+    ('城市:ne:上海', [1, 3, 4]),  # 空值满足 ne
+    ('数量:gt:5', [1, 3]),
+    ('数量:le:3', [0, 4]),  # NaN 不参与大小比较
+    ('备注:contains:A', [0, 4]),  # 不区分大小写
+    ('备注:startswith:b', [1]),
+    ('城市:in:北京|广州', [1, 3]),
+    ('数量:in:1|7', [3, 4]),
+    ('数量:null', [2]),
+    ('城市:notnull', [0, 1, 2, 3]),
+    ('备注:gt:5', [2]),  # 混合类型列按数值比较，文本值不满足
+    ('日期:ge:2024-01-02', [0, 3, 4]),
+    ('城市:eq:a:b', []),  # 值中可以有冒号
+])
+def test_filter_ops(frame, spec, expected):
+    assert list(query(frame, ('filter', spec)).index) == expected
+
+
+def test_filters_are_combined(frame):
+    result = query(frame, ('filter', '城市:eq:上海'), ('filter', '数量:notnull'))
+    assert list(result.index) == [0]
+
+
+def test_multi_column_sort(frame):
+    result = query(frame, ('sort', '城市,-数量'))
+    assert list(result.index) == [0, 2, 1, 3, 4]  # 空值排在最后
+    assert list(query(frame, ('sort', '-数量')).index) == [1, 3, 0, 4, 2]
+
+
+def test_sort_mixed_type_column(frame):
+    # 数字和文本无法直接比较，按文本排序，空值仍排在最后
+    assert query(frame, ('sort', '备注'))['备注'].tolist() == [12, 'A-1', 'a-3', 'b-2', None]
+    assert query(frame, ('sort', '-备注'))['备注'].tolist() == ['b-2', 'a-3', 'A-1', 12, None]
+
+
+def test_group_and_aggregate(frame):
+    result = query(frame, ('group', '城市'), ('agg', 'sum:数量'), ('agg', 'count:数量'),
+                   ('agg', 'mean:数量'), ('agg', 'count'), ('sort', '-sum(数量)'))
+    assert list(result.columns) == ['城市', 'sum(数量)', 'count(数量)', 'mean(数量)', 'count']
+    rows = result.astype(object).where(result.notna(), None).values.tolist()
+    assert rows == [
+        ['北京', 10.0, 1, 10.0, 1],
+        ['广州', 7.0, 1, 7.0, 1],
+        ['上海', 3.0, 1, 3.0, 2],
+        [None, 1.0, 1, 1.0, 1],
+    ]
+
+
+def test_aggregate_without_group(frame):
+    result = query(frame, ('filter', '城市:eq:上海'), ('agg', 'sum:数量'), ('agg', 'count'))
+    assert result.to_dict('records') == [{'sum(数量)': 3.0, 'count': 2}]
+
+
+def test_group_defaults_to_row_count(frame):
+    result = query(frame, ('group', '城市'))
+    assert result['count'].tolist() == [2, 1, 1, 1]
+
+
+def test_numeric_header_matched_by_text():
+    frame = pd.DataFrame({2024: [1, 2], 'x': [5, 6]})
+    assert query(frame, ('filter', '2024:eq:2'))['x'].tolist() == [6]
+
+
+@pytest.mark.parametrize('pairs, message', [
+    ([('filter', '城市')], '无法解析筛选条件'),
+    ([('filter', '城市:between:1')], '无法解析筛选条件'),
+    ([('filter', '城市:eq')], '筛选条件缺少值'),
+    ([('agg', 'max:数量')], '不支持的汇总函数'),
+    ([('agg', 'sum')], '需要指定列名'),
+])
+def test_parse_errors(pairs, message):
+    with pytest.raises(QueryError, match=message):
+        parse_query(MultiDict(pairs))
+
+
+@pytest.mark.parametrize('pairs', [
+    [('filter', '不存在:eq:1')],
+    [('sort', '不存在')],
+    [('group', '不存在')],
+    [('agg', 'sum:不存在')],
+    [('group', '城市'), ('sort', 'sum(数量)')],  # 未请求的汇总列
+])
+def test_unknown_column(frame, pairs):
+    with pytest.raises(QueryError, match='列不存在'):
+        query(frame, *pairs)
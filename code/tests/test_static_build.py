@@ -0,0 +1,143 @@
+"""static_build 的增量生成：未变化的工作簿不重新处理，输出文件逐字节相同、修改时间不变"""
+import os
+import sys
+import json
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import static_build  # noqa: E402
+from static_build import MANIFEST_NAME, build_static_site  # noqa: E402
+
+
+def write_workbook(folder, filename, sheets):
+    with pd.ExcelWriter(os.path.join(folder, filename)) as writer:
+        for sheet_name, frame in sheets.items():
+            frame.to_excel(writer, sheet_name=sheet_name, index=False)
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    """源文件夹含两个工作簿；记录每次生成实际处理了哪些工作簿"""
+    excel_folder, output_dir = tmp_path / 'excel_files', tmp_path / 'docs'
+    excel_folder.mkdir()
+    write_workbook(excel_folder, 'a.xlsx', {'城市': pd.DataFrame({'名称': ['上海', '北京'], '数量': [1, 2]}),
+                                            '空表': pd.DataFrame({'列': []})})
+    write_workbook(excel_folder, 'b.xlsx', {'Sheet1': pd.DataFrame({'x': [1.5, None], 'y': ['p', 'q']})})
+
+    processed = []
+    build_workbook = static_build.build_workbook
+
+    def record_build(output_dir, filename, *args):
+        processed.append(filename)
+        return build_workbook(output_dir, filename, *args)
+
+    monkeypatch.setattr(static_build, 'build_workbook', record_build)
+
+    def build(**kwargs):
+        processed.clear()
+        return build_static_site(str(output_dir), str(excel_folder), workers=1, **kwargs)
+
+    return excel_folder, output_dir, build, processed
+
+
+def snapshot(output_dir):
+    """输出目录中每个文件的 (内容, 修改时间)"""
+    files = {}
+    for root, _, names in os.walk(output_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                files[os.path.relpath(path, output_dir)] = (f.read(), os.stat(path).st_mtime_ns)
+    return files
+
+
+def workbook_paths(manifest, filename):
+    return {entry['path'] for entry in manifest['files'][filename].values()} | {manifest['search'][filename]['path']}
+
+
+def test_unchanged_rebuild_is_identical(site):
+    _, output_dir, build, processed = site
+    first = build()
+    assert processed == ['a.xlsx', 'b.xlsx']
+    before = snapshot(output_dir)
+
+    assert build() == first
+    assert processed == []
+    assert snapshot(output_dir) == before
+
+
+def test_touched_file_with_same_content_is_reused(site):
+    excel_folder, output_dir, build, processed = site
+    build()
+    before = snapshot(output_dir)
+    stat = os.stat(excel_folder / 'a.xlsx')
+    os.utime(excel_folder / 'a.xlsx', ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    build()
+    assert processed == []
+    after = snapshot(output_dir)
+    assert {path: value for path, value in after.items() if path != static_build.BUILD_MANIFEST_NAME} == \
+        {path: value for path, value in before.items() if path != static_build.BUILD_MANIFEST_NAME}
+
+
+def test_only_changed_workbook_is_rewritten(site):
+    excel_folder, output_dir, build, processed = site
+    first = build()
+    before = snapshot(output_dir)
+
+    write_workbook(excel_folder, 'b.xlsx', {'Sheet1': pd.DataFrame({'x': [9.5], 'y': ['changed']})})
+    second = build()
+    assert processed == ['b.xlsx']
+    after = snapshot(output_dir)
+
+    # a.xlsx 的数据文件和索引逐字节相同，修改时间也不变
+    assert second['files']['a.xlsx'] == first['files']['a.xlsx']
+    for path in workbook_paths(first, 'a.xlsx'):
+        assert after[path] == before[path]
+    # b.xlsx 写出了新文件，旧文件已删除
+    assert workbook_paths(second, 'b.xlsx').isdisjoint(workbook_paths(first, 'b.xlsx'))
+    assert not any(path in after for path in workbook_paths(first, 'b.xlsx'))
+    with open(output_dir / MANIFEST_NAME, encoding='utf-8') as f:
+        assert json.load(f)['files']['b.xlsx']['Sheet1']['row_count'] == 1
+
+
+def test_sheet_data_file(site):
+    _, output_dir, build, _ = site
+    manifest = build()
+    entry = manifest['files']['b.xlsx']['Sheet1']
+    with open(output_dir / entry['path'], encoding='utf-8') as f:
+        assert json.load(f) == {'columns': ['x', 'y'], 'rows': [[1.5, 'p'], ['', 'q']]}
+    assert (entry['row_count'], entry['col_count']) == (2, 2)
+
+
+def test_removed_workbooks_are_pruned(site):
+    excel_folder, output_dir, build, _ = site
+    first = build()
+
+    os.remove(excel_folder / 'b.xlsx')
+    second = build()
+    assert list(second['files']) == ['a.xlsx']
+    assert not any((output_dir / path).exists() for path in workbook_paths(first, 'b.xlsx'))
+
+    os.remove(excel_folder / 'a.xlsx')
+    emptied = build()
+    assert (emptied['files'], emptied['search']) == ({}, {})
+    assert os.listdir(output_dir / static_build.DATA_DIR) == []
+    with open(output_dir / MANIFEST_NAME, encoding='utf-8') as f:
+        assert json.load(f)['files'] == {}
+
+
+def test_precompression_is_opt_in(site):
+    _, output_dir, build, processed = site
+    build()
+    assert not any(name.endswith(('.gz', '.br')) for name in snapshot(output_dir))
+
+    manifest = build(precompress=('gzip',))
+    assert processed == ['a.xlsx', 'b.xlsx']  # 压缩设置变化，全部重新生成
+    for filename in manifest['files']:
+        assert all((output_dir / (path + '.gz')).exists() for path in workbook_paths(manifest, filename))
+
+    build(precompress=())
+    assert not any(name.endswith(('.gz', '.br')) for name in snapshot(output_dir))
@@ -1,348 +1,50 @@
 # ===== Mac GitHub Pages 完整部署指南 =====
 
 import os
-import json
-import pandas as pd
+import sys
 import qrcode
 from datetime import datetime
 import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'code'))
+from static_build import MANIFEST_NAME, build_static_site, render_viewer_page, write_site
 # 确保输出到docs文件夹
 output_dir = "docs"
 if not os.path.exists(output_dir):
     os.makedirs(output_dir)
 
-def create_static_excel_viewer():
-    """创建静态Excel查看器"""
+def create_static_excel_viewer(workers=None):
+    """创建静态Excel查看器
+
+    workers 为并行处理工作簿的进程数，默认为CPU核数。
+    """
 
     print("🔄 正在生成静态网站...")
 
-    # 1. 读取Excel文件并转换为JSON
-    excel_data = {}
+    output_dir = "docs"  # GitHub Pages 推荐使用 docs 文件夹
     excel_folder = "excel_files"
-
     if not os.path.exists(excel_folder):
         os.makedirs(excel_folder)
         print(f"❌ 请先将Excel文件放入 {excel_folder} 文件夹")
         return None
 
-    # 扫描Excel文件
-    for filename in os.listdir(excel_folder):
-        if filename.endswith(('.xlsx', '.xls')):
-            file_path = os.path.join(excel_folder, filename)
-            try:
-                df = pd.read_excel(file_path, sheet_name=None)
-                excel_data[filename] = {}
-
-                for sheet_name, sheet_df in df.items():
-                    sheet_df = sheet_df.fillna('')
-                    excel_data[filename][sheet_name] = {
-                        'data': sheet_df.to_dict('records'),
-                        'columns': list(sheet_df.columns),
-                        'row_count': len(sheet_df),
-                        'col_count': len(sheet_df.columns)
-                    }
-                print(f"✅ 已处理: {filename}")
-            except Exception as e:
-                print(f"❌ 处理文件 {filename} 时出错: {e}")
-
-    if not excel_data:
+    # 1. 读取Excel文件，每个工作表写成一个数据文件，页面只内嵌清单
+    #    内容未变化的工作簿沿用上次生成的数据文件，不再解析；GitHub Pages 自行压缩，不写预压缩副本
+    manifest = build_static_site(output_dir, excel_folder, workers, precompress=())
+    if not manifest['files']:
         print("❌ 未找到Excel文件，请检查 excel_files 文件夹")
         return None
 
-    # 2. 创建输出目录
-    output_dir = "docs"  # GitHub Pages 推荐使用 docs 文件夹
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-
-    # 3. 生成完整的HTML页面
-    html_content = f"""<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Excel数据查看器</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
-    <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
-    <style>
-        body {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            font-family: 'Arial', sans-serif;
-        }}
-        .main-container {{ padding: 2rem 0; }}
-        .card {{
-            border: none;
-            border-radius: 20px;
-            box-shadow: 0 15px 35px rgba(0,0,0,0.1);
-            background: rgba(255,255,255,0.95);
-            backdrop-filter: blur(10px);
-        }}
-        .card-header {{
-            background: linear-gradient(45deg, #28a745, #20c997);
-            color: white;
-            border-radius: 20px 20px 0 0 !important;
-            text-align: center;
-            padding: 2rem;
-            border: none;
-        }}
-        .file-card {{
-            background: #f8f9fa;
-            border-radius: 15px;
-            padding: 1.5rem;
-            margin: 1rem 0;
-            border-left: 5px solid #28a745;
-            transition: all 0.3s ease;
-        }}
-        .file-card:hover {{
-            transform: translateY(-3px);
-            box-shadow: 0 8px 25px rgba(0,0,0,0.1);
-            background: #e9ecef;
-        }}
-        .sheet-badge {{
-            background: linear-gradient(45deg, #007bff, #0056b3);
-            color: white;
-            padding: 0.5rem 1rem;
-            border-radius: 20px;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            display: inline-block;
-            margin: 0.25rem;
-        }}
-        .sheet-badge:hover {{
-            transform: scale(1.05);
-            box-shadow: 0 5px 15px rgba(0,123,255,0.3);
-        }}
-        .table-container {{
-            max-height: 70vh;
-            overflow: auto;
-            border-radius: 10px;
-            background: white;
-        }}
-        .table {{
-            margin-bottom: 0;
-        }}
-        .table th {{
-            background: #f8f9fa;
-            border-top: none;
-            position: sticky;
-            top: 0;
-            z-index: 10;
-            font-weight: 600;
-        }}
-        .table tbody tr:hover {{
-            background-color: #e3f2fd;
-        }}
-        .stats-badge {{
-            background: rgba(255,255,255,0.2);
-            color: white;
-            padding: 0.5rem 1rem;
-            border-radius: 15px;
-            font-size: 0.9em;
-            display: inline-block;
-            margin: 0.25rem;
-        }}
-        .github-badge {{
-            position: fixed;
-            top: 20px;
-            right: 20px;
-            background: #333;
-            color: white;
-            padding: 0.5rem 1rem;
-            border-radius: 20px;
-            text-decoration: none;
-            font-size: 0.9em;
-            z-index: 1000;
-        }}
-        .github-badge:hover {{
-            background: #555;
-            color: white;
-        }}
-    </style>
-</head>
-<body>
-    <!-- GitHub 角标 -->
-    <a href="#" class="github-badge" id="github-link">
-        <i class="fab fa-github"></i> View on GitHub
-    </a>
-
-    <div class="container main-container">
-        <div class="row justify-content-center">
-            <div class="col-lg-10">
-                <div class="card">
-                    <div class="card-header">
-                        <h1><i class="fas fa-table"></i> Excel数据查看器</h1>
-                        <div>
-                            <span class="stats-badge">
-                                <i class="fas fa-database"></i> {len(excel_data)} 个文件
-                            </span>
-                            <span class="stats-badge">
-                                <i class="fas fa-clock"></i> {datetime.now().strftime('%Y-%m-%d %H:%M')}
-                            </span>
-                        </div>
-                    </div>
-                    <div class="card-body">
-                        <div id="file-list">
-                            <!-- 文件列表 -->
-                        </div>
-
-                        <!-- 数据显示区域 -->
-                        <div id="data-display" style="display: none;">
-                            <div class="d-flex justify-content-between align-items-center mb-3">
-                                <h4 id="current-title"></h4>
-                                <button class="btn btn-outline-secondary" onclick="showFileList()">
-                                    <i class="fas fa-arrow-left"></i> 返回列表
-                                </button>
-                            </div>
-                            <div id="table-container" class="table-container">
-                                <!-- 表格数据 -->
-                            </div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </div>
-    </div>
-
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js"></script>
-    <script>
-        // Excel数据嵌入
-        const excelData = {json.dumps(excel_data, ensure_ascii=False, indent=2)};
-
-        // 设置GitHub链接
-        document.getElementById('github-link').href = window.location.origin + window.location.pathname;
-
-        // 生成文件列表
-        function generateFileList() {{
-            const container = document.getElementById('file-list');
-            let html = '';
-
-            for (const [filename, sheets] of Object.entries(excelData)) {{
-                const totalRows = Object.values(sheets).reduce((sum, sheet) => sum + sheet.row_count, 0);
-
-                html += `
-                    <div class="file-card">
-                        <div class="d-flex justify-content-between align-items-start mb-3">
-                            <div>
-                                <h4 class="mb-1">
-                                    <i class="fas fa-file-excel text-success"></i> 
-                                    ${{filename}}
-                                </h4>
-                                <small class="text-muted">
-                                    <i class="fas fa-layer-group"></i> ${{Object.keys(sheets).length}} 个工作表
-                                    <i class="fas fa-chart-bar ms-3"></i> 共 ${{totalRows}} 行数据
-                                </small>
-                            </div>
-                        </div>
-                        <div class="sheet-badges">
-                `;
-
-                for (const [sheetName, sheetData] of Object.entries(sheets)) {{
-                    html += `
-                        <span class="sheet-badge" onclick="showSheet('${{filename}}', '${{sheetName}}')">
-                            <i class="fas fa-table"></i> ${{sheetName}}
-                            <small>(${{sheetData.row_count}}×${{sheetData.col_count}})</small>
-                        </span>
-                    `;
-                }}
-
-                html += `
-                        </div>
-                    </div>
-                `;
-            }}
-
-            container.innerHTML = html || `
-                <div class="text-center py-5">
-                    <i class="fas fa-folder-open fa-4x text-muted mb-3"></i>
-                    <h4>暂无数据</h4>
-                    <p class="text-muted">请检查Excel文件是否正确处理</p>
-                </div>
-            `;
-        }}
-
-        // 显示工作表数据
-        function showSheet(filename, sheetName) {{
-            const sheetData = excelData[filename][sheetName];
-
-            // 更新标题
-            document.getElementById('current-title').innerHTML = `
-                <i class="fas fa-file-excel text-success"></i> ${{filename}} 
-                <i class="fas fa-angle-right mx-2"></i> 
-                <i class="fas fa-table text-primary"></i> ${{sheetName}}
-            `;
-
-            // 生成表格
-            let tableHtml = `
-                <div class="table-responsive">
-                    <table class="table table-striped table-hover">
-                        <thead class="table-dark">
-                            <tr>
-                                <th style="min-width: 60px;">#</th>
-            `;
-
-            // 表头
-            sheetData.columns.forEach(col => {{
-                tableHtml += `<th style="min-width: 120px;">${{col || '未命名列'}}</th>`;
-            }});
-
-            tableHtml += '</tr></thead><tbody>';
-
-            // 数据行
-            if (sheetData.data.length === 0) {{
-                tableHtml += `
-                    <tr>
-                        <td colspan="${{sheetData.columns.length + 1}}" class="text-center py-4">
-                            <i class="fas fa-info-circle text-muted"></i> 此工作表暂无数据
-                        </td>
-                    </tr>
-                `;
-            }} else {{
-                sheetData.data.forEach((row, index) => {{
-                    tableHtml += `<tr><td class="fw-bold">${{index + 1}}</td>`;
-                    sheetData.columns.forEach(col => {{
-                        const cellValue = row[col] || '';
-                        tableHtml += `<td title="${{cellValue}}">${{cellValue}}</td>`;
-                    }});
-                    tableHtml += '</tr>';
-                }});
-            }}
-
-            tableHtml += '</tbody></table></div>';
-
-            document.getElementById('table-container').innerHTML = tableHtml;
-
-            // 切换显示
-            document.getElementById('file-list').style.display = 'none';
-            document.getElementById('data-display').style.display = 'block';
-
-            // 滚动到顶部
-            window.scrollTo(0, 0);
-        }}
-
-        // 返回文件列表
-        function showFileList() {{
-            document.getElementById('file-list').style.display = 'block';
-            document.getElementById('data-display').style.display = 'none';
-            window.scrollTo(0, 0);
-        }}
-
-        // 页面加载完成后初始化
-        document.addEventListener('DOMContentLoaded', function() {{
-            generateFileList();
-            console.log('Excel数据查看器已加载完成');
-            console.log('包含文件:', Object.keys(excelData));
-        }});
-    </script>
-</body>
-</html>"""
-
-    # 4. 写入HTML文件
-    index_path = os.path.join(output_dir, 'index.html')
-    with open(index_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    # 2. 生成完整的HTML页面
+    html_content = render_viewer_page(manifest)
+
+    # 3. 写入HTML文件
+    # 样式和脚本提取为带内容哈希的资源文件，并生成 Service Worker
+    index_path = write_site(output_dir, html_content, MANIFEST_NAME)
 
     print(f"✅ 静态网站已生成: {index_path}")
-    print(f"📊 包含 {len(excel_data)} 个Excel文件")
+    print(f"📊 包含 {len(manifest['files'])} 个Excel文件，工作表数据位于 {os.path.join(output_dir, 'data')}")
+    print("💡 本地预览请在 docs 目录运行 python -m http.server（页面需通过HTTP读取数据文件）")
 
     return output_dir
 